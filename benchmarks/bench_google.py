@@ -0,0 +1,141 @@
+"""Benchmark the Google dump path against a fake Mobileclient.
+
+Measures GoogleProvider.dump() with an empty (cold) and a filled (warm)
+cache, GoogleProvider.stream() with a warm cache, and the whole "dump google" command for both output formats: wall
+time, peak memory and the size of the output. No network access is needed.
+
+    python benchmarks/bench_google.py --sizes 1000,10000,100000
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_mobileclient import FakeMobileclient  # noqa: E402 pylint: disable=C0413
+from spotmover import cli  # noqa: E402 pylint: disable=C0413
+from spotmover.providers import google  # noqa: E402 pylint: disable=C0413
+from spotmover.providers.google import CachedGoogleProvider  # noqa: E402 pylint: disable=C0413
+
+
+def make_provider_cls(client):
+    class BenchGoogleProvider(CachedGoogleProvider):
+        def init_api(self):
+            return client
+
+    return BenchGoogleProvider
+
+
+def measure(func):
+    tracemalloc.reset_peak()
+    # the library of the fake client is already allocated, only the growth is reported
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    func()
+    return {
+        "wall_time": time.perf_counter() - start,
+        "peak_memory": tracemalloc.get_traced_memory()[1] - baseline,
+    }
+
+
+def consume(data):
+    for _ in data["songs"]:
+        pass
+    for playlist in data["playlists"]:
+        for _ in playlist["tracks"]:
+            pass
+
+
+def bench_dump(provider_cls, cache_dir):
+    results = []
+    for phase in ("cold", "warm"):
+        provider = provider_cls(cache_dir=cache_dir)
+        provider.lazy_authenticate("benchmark", "benchmark")
+        result = measure(provider.dump)
+        result.update(step="dump()", phase=phase, output_size=None)
+        results.append(result)
+
+    provider = provider_cls(cache_dir=cache_dir)
+    provider.lazy_authenticate("benchmark", "benchmark")
+    result = measure(lambda: consume(provider.stream()))
+    result.update(step="stream()", phase="warm", output_size=None)
+    results.append(result)
+    return results
+
+
+def bench_cli(provider_cls, cache_dir, workdir):
+    config_path = os.path.join(workdir, "config.ini")
+    with open(config_path, "w") as outfile:
+        outfile.write("[google]\nusername=benchmark\npassword=benchmark\n")
+
+    results = []
+    # the command imports the provider when it runs
+    with mock.patch.object(google, "CachedGoogleProvider", provider_cls):
+        for output_format in ("json", "ndjson"):
+            output = os.path.join(workdir, "dump." + output_format)
+            args = ["-c", config_path, "--cache-dir", cache_dir, "dump", "google", "-o", output]
+            result = measure(lambda: cli.click_main.main(args, standalone_mode=False))  # pylint: disable=W0640
+            result.update(step="dump google", phase=output_format, output_size=os.path.getsize(output))
+            results.append(result)
+    return results
+
+
+def run_benchmarks(args):
+    results = []
+    for size in args.sizes:
+        client = FakeMobileclient(size, deleted_rate=args.deleted_rate, library_rate=args.library_rate, seed=args.seed)
+        provider_cls = make_provider_cls(client)
+        workdir = tempfile.mkdtemp(prefix="spotmover-bench-")
+        try:
+            for result in bench_dump(provider_cls, os.path.join(workdir, "cache")):
+                result["size"] = size
+                results.append(result)
+                print_result(result)
+            # the command runs with a warm cache, to measure the transform and the output only
+            for result in bench_cli(provider_cls, os.path.join(workdir, "cache"), workdir):
+                result["size"] = size
+                results.append(result)
+                print_result(result)
+        finally:
+            shutil.rmtree(workdir)
+    return results
+
+
+def print_result(result):
+    output = ""
+    if result["output_size"] is not None:
+        output = "{:8.1f} MiB output".format(result["output_size"] / 2 ** 20)
+    print("{size:>7} {step:<12} {phase:<7} {wall_time:8.2f}s {peak:8.1f} MiB peak {output}".format(
+        peak=result["peak_memory"] / 2 ** 20, output=output, **result
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [int(x) for x in value.split(",") if x.strip()],
+                        default=[1000, 10000], help="Comma separated numbers of songs (default: 1000,10000)")
+    parser.add_argument("--deleted-rate", type=float, default=0.1, help="Fraction of deleted playlists")
+    parser.add_argument("--library-rate", type=float, default=0.2,
+                        help="Fraction of playlist entries without track metadata (source 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    tracemalloc.start()
+    results = run_benchmarks(args)
+    if args.json_path:
+        with open(args.json_path, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark load_songs, load_playlists and dump against a local fake Spotify API.
+
+Every run loads a synthetic dump twice with the same cache directory: first
+with an empty cache (cold), then with the cache filled by the first run
+(warm). The library of the fake server is emptied between the runs, so that
+only the cache differs. The library left by the last load is then dumped
+twice, the second time with the playlist contents cached. No network access
+is needed.
+
+    python benchmarks/bench_load.py --sizes 1000,10000 --backends sync,async
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_spotify import Catalog, FakeSpotifyServer  # noqa: E402 pylint: disable=C0413
+from gendump import generate_dump  # noqa: E402 pylint: disable=C0413
+from spotmover.dump import Dump  # noqa: E402 pylint: disable=C0413
+from spotmover.journal import Journal  # noqa: E402 pylint: disable=C0413
+from spotmover.providers.spotify.spotify import CachedSpotifyProvider  # noqa: E402 pylint: disable=C0413
+
+
+def get_provider_cls(backend):
+    if backend == "async":
+        from spotmover.providers.spotify.aio import CachedAsyncSpotifyProvider
+        return CachedAsyncSpotifyProvider
+    return CachedSpotifyProvider
+
+
+def albums_of(data):
+    seen = dict.fromkeys((song["artist"], song["album"]) for song in data["songs"])
+    return [{"artist": artist, "album": album} for artist, album in seen]
+
+
+def measure(server, step, func):
+    server.calls.clear()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    func()
+    wall_time = time.perf_counter() - start
+    return {
+        "step": step,
+        "wall_time": wall_time,
+        "api_calls": sum(count for endpoint, count in server.calls.items() if endpoint not in ("429", "5xx")),
+        "calls": dict(server.calls),
+        "peak_memory": tracemalloc.get_traced_memory()[1],
+    }
+
+
+def run_load(server, data, backend, jobs, rate, cache_dir):
+    provider = get_provider_cls(backend)(jobs=jobs, rate=rate, journal=Journal(), cache_dir=cache_dir)
+    provider.api_prefix = server.url
+    provider.connect("benchmark-token", "benchmark")
+
+    dump = Dump({"origin": "google", "songs": [], "albums": albums_of(data), "playlists": data["playlists"]})
+    results = [
+        measure(server, "load_songs", lambda: provider.load_songs(dump)),
+        measure(server, "load_playlists", lambda: provider.load_playlists(dump, True, True)),
+    ]
+    provider._cache.flush()  # pylint: disable=W0212
+    return results
+
+
+def run_export(server, jobs, rate, cache_dir):
+    provider = CachedSpotifyProvider(jobs=jobs, rate=rate, cache_dir=cache_dir)
+    provider.api_prefix = server.url
+    provider.connect("benchmark-token", "benchmark")
+    return measure(server, "dump", provider.dump)
+
+
+def run_benchmarks(args):
+    results = []
+    for size in args.sizes:
+        data = generate_dump(size, args.seed)
+        catalog = Catalog(data["songs"], missing_rate=args.missing_rate)
+        server = FakeSpotifyServer(catalog, latency=args.latency, error_rate=args.error_rate,
+                                   throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed)
+        with server:
+            for backend in args.backends:
+                cache_dir = tempfile.mkdtemp(prefix="spotmover-bench-")
+                try:
+                    for phase in ("cold", "warm"):
+                        server.reset()
+                        for result in run_load(server, data, backend, args.jobs, args.rate, cache_dir):
+                            result.update(size=size, backend=backend, phase=phase)
+                            results.append(result)
+                            print_result(result)
+                finally:
+                    shutil.rmtree(cache_dir)
+
+            # exports the library left by the last load, the second time with unchanged playlist snapshots
+            cache_dir = tempfile.mkdtemp(prefix="spotmover-bench-")
+            try:
+                for phase in ("cold", "warm"):
+                    result = run_export(server, args.jobs, args.rate, cache_dir)
+                    result.update(size=size, backend="sync", phase=phase)
+                    results.append(result)
+                    print_result(result)
+            finally:
+                shutil.rmtree(cache_dir)
+    return results
+
+
+def print_result(result):
+    print("{size:>7} {backend:<6} {phase:<5} {step:<15} {wall_time:8.2f}s {api_calls:7} calls "
+          "{peak:8.1f} MiB".format(peak=result["peak_memory"] / 2 ** 20, **result))
+
+
+def parse_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [int(x) for x in parse_list(value)], default=[1000],
+                        help="Comma separated numbers of songs (default: 1000)")
+    parser.add_argument("--backends", type=parse_list, default=["sync"], help="sync, async or both (default: sync)")
+    parser.add_argument("-j", "--jobs", type=int, default=16, help="Concurrent lookups (default: 16)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Rate limit of the client (default: 1000/s)")
+    parser.add_argument("--latency", type=float, default=0.01, help="Server latency in seconds (default: 0.01)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 502 responses (not for POST)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After of the 429 responses")
+    parser.add_argument("--missing-rate", type=float, default=0.05,
+                        help="Fraction of albums and songs missing from the catalog (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    # the errors injected by the server are logged by spotipy before they are retried
+    logging.getLogger("spotipy").setLevel(logging.CRITICAL)
+    tracemalloc.start()
+    results = run_benchmarks(args)
+    if args.json_path:
+        with open(args.json_path, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+
+
+if __name__ == "__main__":
+    main()
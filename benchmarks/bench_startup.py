@@ -0,0 +1,99 @@
+"""Benchmark the startup time of the command line interface.
+
+Every command runs in a fresh interpreter, as it does for the user, and the
+median wall time of the runs is reported, with the heavy dependencies the
+command imported on the way.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("gmusicapi", "spotipy", "aiohttp", "texttable")
+COMMANDS = (
+    ["--help"],
+    ["cache", "--help"],
+    ["dump", "--help"],
+    ["load", "spotify", "--help"],
+    ["cache", "stats"],
+)
+
+# runs the command like the console script, then prints the heavy modules it imported to stderr
+_RUNNER = """
+import sys
+from spotmover.cli import click_main
+try:
+    click_main.main(sys.argv[1:], prog_name="spotmover")
+except SystemExit:
+    pass
+finally:
+    sys.stderr.write("\\nIMPORTED " + ",".join(m for m in {modules!r} if m in sys.modules) + "\\n")
+""".format(modules=HEAVY_MODULES)
+
+
+def run_command(args, env):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", _RUNNER] + args, env=env, cwd=ROOT, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, universal_newlines=True, check=False)
+    wall_time = time.perf_counter() - start
+    imported = []
+    for line in proc.stderr.splitlines():
+        if line.startswith("IMPORTED "):
+            imported = [module for module in line[len("IMPORTED "):].split(",") if module]
+    return wall_time, imported
+
+
+def run_benchmarks(args):
+    workdir = tempfile.mkdtemp(prefix="spotmover-bench-")
+    try:
+        config_path = os.path.join(workdir, "config.ini")
+        with open(config_path, "w") as outfile:
+            outfile.write("[cache]\ndirectory={}\n".format(os.path.join(workdir, "cache")))
+        env = dict(os.environ, PYTHONPATH=ROOT)
+
+        results = []
+        for command in COMMANDS:
+            command_args = ["-c", config_path] + command
+            times = []
+            imported = []
+            for _ in range(args.runs):
+                wall_time, imported = run_command(command_args, env)
+                times.append(wall_time)
+            result = {"command": " ".join(command), "median": statistics.median(times), "min": min(times),
+                      "imported": imported}
+            results.append(result)
+            print_result(result)
+        return results
+    finally:
+        shutil.rmtree(workdir)
+
+
+def print_result(result):
+    print("{command:<22} {median:6.3f}s median {min:6.3f}s min  imports: {modules}".format(
+        modules=", ".join(result["imported"]) or "-", **result
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Runs of every command (default: 5)")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    if args.json_path:
+        with open(args.json_path, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Offline stand-in for gmusicapi.Mobileclient with a synthetic library.
+
+Songs and playlist entries carry the fields of the real payloads, not only
+the ones spotmover reads, so that the cost of transforming them is
+realistic. A ``deleted_rate`` fraction of the playlists are deleted, and a
+``library_rate`` fraction of the playlist entries are library tracks
+(source "1") without embedded track metadata, which spotmover skips.
+"""
+
+import random
+import uuid
+
+from gendump import generate_dump
+
+
+def _song_payload(rnd, song, track_no):
+    track_id = str(uuid.UUID(int=rnd.getrandbits(128)))
+    return {
+        "kind": "sj#track",
+        "id": track_id,
+        "clientId": track_id,
+        "storeId": "T" + track_id.replace("-", "")[:26],
+        "nid": track_id.replace("-", "")[:26],
+        "title": song["title"],
+        "artist": song["artist"],
+        "albumArtist": song["artist"],
+        "album": song["album"],
+        "composer": "",
+        "genre": "Pop",
+        "year": rnd.randint(1960, 2020),
+        "trackNumber": track_no,
+        "discNumber": 1,
+        "totalTrackCount": 12,
+        "totalDiscCount": 1,
+        "durationMillis": str(rnd.randint(120000, 420000)),
+        "estimatedSize": str(rnd.randint(3000000, 12000000)),
+        "playCount": rnd.randint(0, 100),
+        "rating": "0",
+        "creationTimestamp": "1500000000000000",
+        "lastModifiedTimestamp": "1500000000000000",
+        "recentTimestamp": "1500000000000000",
+        "deleted": False,
+        "albumArtRef": [{"kind": "sj#imageRef", "url": "http://lh3.example.com/{}".format(track_id)}],
+        "artistId": ["A" + track_id.replace("-", "")[:26]],
+        "albumId": "B" + track_id.replace("-", "")[:26],
+    }
+
+
+class FakeMobileclient:
+    FROM_MAC_ADDRESS = object()
+
+    def __init__(self, num_songs=1000, num_playlists=None, playlist_size=50, deleted_rate=0.1, library_rate=0.2,
+                 seed=0):
+        rnd = random.Random(seed)
+        data = generate_dump(num_songs, seed, num_playlists=num_playlists, playlist_size=playlist_size)
+        self.songs = [_song_payload(rnd, song, idx % 12 + 1) for idx, song in enumerate(data["songs"])]
+        by_key = {(song["albumArtist"], song["album"], song["title"]): song for song in self.songs}
+
+        self.playlists = []
+        for idx, playlist in enumerate(data["playlists"]):
+            entries = []
+            for position, song in enumerate(playlist["tracks"]):
+                track = by_key[(song["artist"], song["album"], song["title"])]
+                entry = {
+                    "kind": "sj#playlistEntry",
+                    "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+                    "absolutePosition": str(position),
+                    "trackId": track["storeId"],
+                    "deleted": False,
+                }
+                if rnd.random() < library_rate:
+                    entry["source"] = "1"
+                else:
+                    entry["source"] = "2"
+                    entry["track"] = track
+                entries.append(entry)
+            self.playlists.append({
+                "kind": "sj#playlist",
+                "id": "P{}".format(idx),
+                "name": playlist["name"],
+                "deleted": rnd.random() < deleted_rate,
+                "type": "USER_GENERATED",
+                "tracks": entries,
+            })
+
+    def login(self, email, password, android_id):  # pylint: disable=W0613
+        return True
+
+    def get_all_songs(self, incremental=False):
+        if not incremental:
+            return list(self.songs)
+        return self._chunks(self.songs, 1000)
+
+    def get_all_user_playlist_contents(self):
+        return list(self.playlists)
+
+    @staticmethod
+    def _chunks(items, size):
+        for start_idx in range(0, len(items), size):
+            yield items[start_idx:start_idx + size]
@@ -0,0 +1,317 @@
+"""Local stand-in for the Spotify Web API endpoints used by spotmover.
+
+The server answers searches and album lookups from a catalog built from the
+songs of a dump, and keeps the saved albums, saved tracks and playlists in
+memory. Playlists get a new snapshot id on every change. Every
+response can be delayed, fail with a server error or be throttled with a 429
+response, to see how the providers behave under these conditions.
+"""
+
+import re
+import json
+import time
+import random
+import threading
+import zlib
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+
+_SEARCH_RE = re.compile(r"^artist:(?P<artist>.*) album:(?P<album>.*?)(?: track:(?P<track>.*))?$")
+
+
+def _stable_id(prefix, *names):
+    return "{}{:08x}".format(prefix, zlib.crc32("\x00".join(names).encode("utf-8")))
+
+
+def _stable_fraction(*names):
+    return zlib.crc32("\x01".join(names).encode("utf-8")) / 2 ** 32
+
+
+class Catalog:
+    """Albums and tracks known by the fake server.
+
+    A ``missing_rate`` fraction of the albums and of the remaining tracks
+    are left out (the same ones on every run), and a ``variant_rate``
+    fraction of the track names get a version suffix such as
+    " - Remastered", as found in the real catalog.
+    """
+
+    def __init__(self, songs, missing_rate=0.05, variant_rate=0.1):
+        self.albums = {}
+        self.albums_by_id = {}
+        self.tracks = {}
+        self.tracks_by_id = {}
+        for song in songs:
+            album_key = (song["artist"], song["album"])
+            if _stable_fraction(*album_key) < missing_rate:
+                continue
+            if album_key not in self.albums:
+                album = {"id": _stable_id("al", *album_key), "artist": song["artist"], "name": song["album"],
+                         "tracks": []}
+                self.albums[album_key] = album
+                self.albums_by_id[album["id"]] = album
+
+            track_key = album_key + (song["title"],)
+            if track_key in self.tracks or _stable_fraction(*track_key) < missing_rate:
+                continue
+            name = song["title"]
+            if _stable_fraction("variant", *track_key) < variant_rate:
+                name += " - Remastered"
+            track = {"id": _stable_id("tr", *track_key), "name": name}
+            self.albums[album_key]["tracks"].append(track)
+            self.tracks[track_key] = (self.albums[album_key], track)
+            self.tracks_by_id[track["id"]] = (self.albums[album_key], track)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeSpotify/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _handle(self, method):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        path = url.path[len("/v1/"):] if url.path.startswith("/v1/") else url.path.lstrip("/")
+        query = dict(parse_qsl(url.query))
+        body = self._read_body()
+
+        endpoint, handler, args = fake.route(method, path)
+        fake.count(endpoint)
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake.roll(fake.throttle_rate):
+            fake.count("429")
+            return self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                              {"Retry-After": str(fake.retry_after)})
+        # the client does not retry a failed POST, as it may have been applied
+        if method != "POST" and fake.roll(fake.error_rate):
+            fake.count("5xx")
+            return self._send(502, {"error": {"status": 502, "message": "Bad gateway"}})
+        if handler is None:
+            return self._send(404, {"error": {"status": 404, "message": "Unknown endpoint"}})
+        return self._send(*handler(query, body, *args))
+
+    def do_GET(self):  # pylint: disable=C0103
+        self._handle("GET")
+
+    def do_POST(self):  # pylint: disable=C0103
+        self._handle("POST")
+
+    def do_PUT(self):  # pylint: disable=C0103
+        self._handle("PUT")
+
+    def do_DELETE(self):  # pylint: disable=C0103
+        self._handle("DELETE")
+
+
+class FakeSpotifyServer:
+    """Threaded HTTP server on localhost, see the module docstring.
+
+    ``latency`` is added to every request in seconds, ``error_rate`` and
+    ``throttle_rate`` are the probabilities of a 502 and a 429 response.
+    POST requests are never answered with a 502, only with a 429.
+    ``calls`` counts the requests by endpoint.
+    """
+
+    def __init__(self, catalog, latency=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=0):
+        self.catalog = catalog
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.saved_albums = []
+        self.saved_tracks = []
+        self.playlists = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._routes = [
+            ("GET", re.compile(r"^search$"), "search", self._search),
+            ("GET", re.compile(r"^albums/?$"), "albums", self._albums),
+            ("GET", re.compile(r"^me/albums$"), "me/albums", self._saved_albums),
+            ("PUT", re.compile(r"^me/(?:albums|library)$"), "me/albums add", self._save_albums),
+            ("GET", re.compile(r"^me/tracks$"), "me/tracks", self._saved_tracks),
+            ("GET", re.compile(r"^me/playlists$"), "me/playlists", self._user_playlists),
+            ("POST", re.compile(r"^users/([^/]+)/playlists$"), "playlist create", self._create_playlist),
+            ("POST", re.compile(r"^playlists/([^/]+)/(?:tracks|items)$"), "playlist add", self._add_tracks),
+            ("GET", re.compile(r"^playlists/([^/]+)/(?:tracks|items)$"), "playlist items", self._playlist_items),
+            ("DELETE", re.compile(r"^playlists/([^/]+)/(?:tracks|items)$"), "playlist remove", self._remove_tracks),
+        ]
+
+    @property
+    def url(self):
+        """API prefix to pass to the clients."""
+        return "http://127.0.0.1:{}/v1/".format(self._httpd.server_address[1])
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset(self):
+        """Forget the saved albums, tracks, playlists and call counts."""
+        with self._lock:
+            self.calls.clear()
+            self.saved_albums = []
+            self.saved_tracks = []
+            self.playlists = {}
+
+    def count(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def roll(self, probability):
+        if not probability:
+            return False
+        with self._lock:
+            return self._random.random() < probability
+
+    def route(self, method, path):
+        for route_method, pattern, endpoint, handler in self._routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                return (endpoint, handler, match.groups())
+        return ("unknown", None, ())
+
+    def _page(self, path, items, query, limit=20):
+        limit = int(query.get("limit", limit))
+        offset = int(query.get("offset", 0))
+        next_url = None
+        if offset + limit < len(items):
+            next_url = "{}{}?offset={}&limit={}".format(self.url, path, offset + limit, limit)
+        return {
+            "items": items[offset:offset + limit],
+            "total": len(items),
+            "limit": limit,
+            "offset": offset,
+            "next": next_url,
+        }
+
+    @staticmethod
+    def _simple_album(album):
+        return {"id": album["id"], "name": album["name"], "artists": [{"name": album["artist"]}]}
+
+    def _album(self, album):
+        tracks = [{"id": track["id"], "name": track["name"], "artists": [{"name": album["artist"]}]}
+                  for track in album["tracks"]]
+        return dict(self._simple_album(album), tracks={
+            "items": tracks, "total": len(tracks), "limit": 50, "offset": 0, "next": None
+        })
+
+    def _track(self, track_id):
+        album, track = self.catalog.tracks_by_id[track_id]
+        return {"id": track["id"], "name": track["name"], "album": self._simple_album(album),
+                "artists": [{"name": album["artist"]}]}
+
+    def _search(self, query, body):  # pylint: disable=W0613
+        match = _SEARCH_RE.match(query.get("q", ""))
+        if match is None:
+            return (400, {"error": {"status": 400, "message": "Unsupported query"}})
+
+        search_type = query.get("type", "track")
+        items = []
+        if search_type == "album":
+            album = self.catalog.albums.get((match.group("artist"), match.group("album")))
+            if album is not None:
+                items.append(self._simple_album(album))
+        else:
+            found = self.catalog.tracks.get((match.group("artist"), match.group("album"), match.group("track")))
+            if found is not None:
+                album, track = found
+                items.append({"id": track["id"], "name": track["name"], "album": self._simple_album(album),
+                              "artists": [{"name": album["artist"]}]})
+        return (200, {search_type + "s": {"items": items, "total": len(items), "limit": 10, "offset": 0,
+                                          "next": None}})
+
+    def _albums(self, query, body):  # pylint: disable=W0613
+        retval = []
+        for album_id in query.get("ids", "").split(","):
+            album = self.catalog.albums_by_id.get(album_id)
+            retval.append(None if album is None else self._album(album))
+        return (200, {"albums": retval})
+
+    def _saved_albums(self, query, body):  # pylint: disable=W0613
+        with self._lock:
+            page = self._page("me/albums", list(self.saved_albums), query)
+        page["items"] = [{"album": self._album(self.catalog.albums_by_id[album_id])} for album_id in page["items"]]
+        return (200, page)
+
+    def _saved_tracks(self, query, body):  # pylint: disable=W0613
+        with self._lock:
+            page = self._page("me/tracks", list(self.saved_tracks), query)
+        page["items"] = [{"track": self._track(track_id)} for track_id in page["items"]]
+        return (200, page)
+
+    def _save_albums(self, query, body):  # pylint: disable=W0613
+        ids = query.get("ids") or query.get("uris", "")
+        with self._lock:
+            self.saved_albums.extend(album_id.rsplit(":", 1)[-1] for album_id in ids.split(",") if album_id)
+        return (200, None)
+
+    def _user_playlists(self, query, body):  # pylint: disable=W0613
+        with self._lock:
+            items = [{"id": playlist_id, "name": playlist["name"], "snapshot_id": str(playlist["snapshot"])}
+                     for playlist_id, playlist in self.playlists.items()]
+        return (200, self._page("me/playlists", items, query, limit=50))
+
+    def _create_playlist(self, query, body, user):  # pylint: disable=W0613
+        with self._lock:
+            playlist_id = "pl{}".format(len(self.playlists))
+            self.playlists[playlist_id] = {"name": body["name"], "tracks": [], "snapshot": 0}
+        return (201, {"id": playlist_id, "name": body["name"], "snapshot_id": "0"})
+
+    def _add_tracks(self, query, body, playlist_id):  # pylint: disable=W0613
+        uris = body["uris"] if isinstance(body, dict) else body
+        with self._lock:
+            playlist = self.playlists[playlist_id]
+            playlist["tracks"].extend(uri.rsplit(":", 1)[-1] for uri in uris)
+            playlist["snapshot"] += 1
+        return (201, {"snapshot_id": str(playlist["snapshot"])})
+
+    def _playlist_items(self, query, body, playlist_id):  # pylint: disable=W0613
+        with self._lock:
+            page = self._page("playlists/{}/tracks".format(playlist_id), list(self.playlists[playlist_id]["tracks"]),
+                              query, limit=100)
+        page["items"] = [{"track": self._track(track_id)} for track_id in page["items"]]
+        return (200, page)
+
+    def _remove_tracks(self, query, body, playlist_id):  # pylint: disable=W0613
+        items = body.get("tracks") or body.get("items") or []
+        removed = {item["uri"].rsplit(":", 1)[-1] for item in items}
+        with self._lock:
+            playlist = self.playlists[playlist_id]
+            playlist["tracks"] = [track_id for track_id in playlist["tracks"] if track_id not in removed]
+            playlist["snapshot"] += 1
+        return (200, {"snapshot_id": str(playlist["snapshot"])})
@@ -0,0 +1,81 @@
+"""Generate synthetic dumps of a given size.
+
+    python benchmarks/gendump.py -n 10000 -o dump-10k.json
+    python benchmarks/gendump.py -n 100000 -o dump-100k.ndjson
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spotmover.dump import write_ndjson  # noqa: E402 pylint: disable=C0413
+
+_SYLLABLES = (
+    "la", "mo", "ri", "ka", "sen", "do", "vi", "ta", "nor", "el", "zu", "pa", "rin", "go", "shi", "be", "lu", "xo",
+    "tor", "mi", "an", "qua", "ne", "sol",
+)
+_DECORATIONS = (" (Remastered 2011)", " [Deluxe Edition]", " - Live", " (feat. {})")
+
+
+def _words(rnd, count):
+    return " ".join(
+        "".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(1, 3))).capitalize() for _ in range(count)
+    )
+
+
+def generate_dump(num_songs, seed=0, album_size=10, num_playlists=None, playlist_size=50):
+    """Return a dump of num_songs songs in albums of about album_size songs.
+
+    The same arguments always produce the same dump. Some names get
+    decorations like "(Remastered 2011)" to exercise the matchers.
+    """
+    rnd = random.Random(seed)
+    artists = [_words(rnd, rnd.randint(1, 2)) for _ in range(max(1, num_songs // (album_size * 3)))]
+
+    songs = []
+    while len(songs) < num_songs:
+        artist = rnd.choice(artists)
+        album = _words(rnd, rnd.randint(1, 3))
+        if rnd.random() < 0.1:
+            album += rnd.choice(_DECORATIONS).format(rnd.choice(artists))
+        for track_no in range(min(rnd.randint(album_size // 2, album_size * 3 // 2), num_songs - len(songs))):
+            title = "{} {}".format(_words(rnd, rnd.randint(1, 4)), track_no + 1)
+            if rnd.random() < 0.05:
+                title += rnd.choice(_DECORATIONS).format(rnd.choice(artists))
+            songs.append({"artist": artist, "album": album, "title": title})
+
+    if num_playlists is None:
+        num_playlists = max(1, num_songs // 500)
+    playlists = [
+        {"name": "Playlist {}".format(idx + 1), "tracks": rnd.sample(songs, min(playlist_size, len(songs)))}
+        for idx in range(num_playlists)
+    ]
+    return {"origin": "google", "songs": songs, "playlists": playlists}
+
+
+def write_dump(path, data):
+    with open(path, "w") as outfile:
+        if path.endswith(".ndjson"):
+            write_ndjson(outfile, data["origin"], data["songs"], data["playlists"])
+        else:
+            json.dump(data, outfile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--songs", type=int, default=1000, help="Number of songs")
+    parser.add_argument("-o", "--output", required=True, help="Output file, ndjson if it ends with .ndjson")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = generate_dump(args.songs, args.seed)
+    write_dump(args.output, data)
+    print("{} songs and {} playlists written to {}".format(len(data["songs"]), len(data["playlists"]), args.output))
+
+
+if __name__ == "__main__":
+    main()
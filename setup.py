@@ -12,10 +12,23 @@ setup(
     author_email="cserna.zsolt@gmail.com",
     description="Migrate Google Play Music library to Spotify",
     long_description=DESCRIPTION,
+    extras_require={
+        "async": ["aiohttp"],
+    },
     entry_points={
         'console_scripts': [
             'spotmover = spotmover.cli:main',
         ],
+        'spotmover.dump': [
+            'google = spotmover.commands.google:dump_google',
+            'spotify = spotmover.commands.spotify:dump_spotify',
+        ],
+        'spotmover.load': [
+            'spotify = spotmover.commands.spotify:load_spotify',
+        ],
+        'spotmover.verify': [
+            'spotify = spotmover.commands.spotify:verify_spotify',
+        ],
     },
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
@@ -2,7 +2,13 @@
 import tempfile
 import os
 import re
+import json
 import pickle
+import sqlite3
+import time
+import threading
+import atexit
+from collections import OrderedDict
 
 pjoin = os.path.join
 
@@ -11,43 +17,57 @@ class NoDefault:
     pass
 
 
-class DiskCache:
-    def __init__(self, cache_id):
-        if not re.match("^[a-zA-Z0-9-_]+$", cache_id):
-            raise ValueError("Invalid cache id: {}".format(cache_id))
-
-        self.cache_dir = pjoin(tempfile.gettempdir(), cache_id)
-        self._ensure_cache_dir()
-
-    def _ensure_cache_dir(self):
-        if not os.path.isdir(self.cache_dir):
-            os.mkdir(self.cache_dir)
+class Cache:
+    """Dict-like cache with an additional sub-key API.
 
-    def _get_path_for_key(self, key):
-        return pjoin(self.cache_dir, key)
+    Plain keys (``cache["songs"]``) hold a single value, while namespaced
+    items (``cache.get_item("albums", (artist, album))``) allow reading and
+    writing a single record without touching the rest of the namespace.
+    """
 
     def haskey(self, key):
-        try:
-            return os.path.getsize(self._get_path_for_key(key)) > 0
-        except FileNotFoundError:
-            return False
+        raise NotImplementedError()
 
     def get(self, key, default=None):
-        if self.haskey(key):
-            with open(self._get_path_for_key(key), "rb") as infile:
-                retval = pickle.load(infile)
-        else:
-            return default
-
-        return retval
+        raise NotImplementedError()
 
     def set(self, key, value):
-        with open(self._get_path_for_key(key), "wb") as outfile:
-            pickle.dump(value, outfile)
+        raise NotImplementedError()
+
+    def remove(self, key):
+        raise NotImplementedError()
 
     def keys(self):
-        for item in os.listdir(self.cache_dir):
-            yield item
+        raise NotImplementedError()
+
+    def has_item(self, namespace, subkey):
+        raise NotImplementedError()
+
+    def get_item(self, namespace, subkey, default=None):
+        raise NotImplementedError()
+
+    def set_item(self, namespace, subkey, value):
+        raise NotImplementedError()
+
+    def remove_item(self, namespace, subkey):
+        raise NotImplementedError()
+
+    def iter_items(self, namespace):
+        raise NotImplementedError()
+
+    def set_many(self, mapping):
+        for key, value in mapping.items():
+            self.set(key, value)
+
+    def set_items(self, namespace, items):
+        for subkey, value in items:
+            self.set_item(namespace, subkey, value)
+
+    def flush(self):
+        pass
+
+    def record_stats(self, hits, misses):
+        pass
 
     def values(self):
         for key in self.keys():
@@ -57,11 +77,6 @@ class DiskCache:
         for key in list(self.keys()):
             del self[key]
 
-    def remove(self, key):
-        if key not in self:
-            raise KeyError(key)
-        os.unlink(self._get_path_for_key(key))
-
     def __getitem__(self, key):
         nodefault = NoDefault()
         retval = self.get(key, nodefault)
@@ -77,3 +92,614 @@ class DiskCache:
 
     def __contains__(self, key):
         return self.haskey(key)
+
+
+class MemoryCache(Cache):
+    def __init__(self):
+        self._data = {}
+        self._items = {}
+
+    def haskey(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key, value):
+        self._data[key] = value
+
+    def remove(self, key):
+        del self._data[key]
+
+    def keys(self):
+        yield from list(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self._items.clear()
+
+    def has_item(self, namespace, subkey):
+        return subkey in self._items.get(namespace, {})
+
+    def get_item(self, namespace, subkey, default=None):
+        return self._items.get(namespace, {}).get(subkey, default)
+
+    def set_item(self, namespace, subkey, value):
+        self._items.setdefault(namespace, {})[subkey] = value
+
+    def remove_item(self, namespace, subkey):
+        try:
+            del self._items[namespace][subkey]
+        except KeyError:
+            raise KeyError((namespace, subkey))
+
+    def iter_items(self, namespace):
+        yield from list(self._items.get(namespace, {}).items())
+
+
+class NullCache(Cache):
+    """Cache which keeps nothing, for data which is read only once."""
+
+    def haskey(self, key):
+        return False
+
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value):
+        pass
+
+    def remove(self, key):
+        raise KeyError(key)
+
+    def keys(self):
+        return iter(())
+
+    def has_item(self, namespace, subkey):
+        return False
+
+    def get_item(self, namespace, subkey, default=None):
+        return default
+
+    def set_item(self, namespace, subkey, value):
+        pass
+
+    def remove_item(self, namespace, subkey):
+        raise KeyError((namespace, subkey))
+
+    def iter_items(self, namespace):
+        return iter(())
+
+
+def _encode_subkey(subkey):
+    return json.dumps(subkey)
+
+
+def _decode_subkey(value):
+    subkey = json.loads(value)
+    if isinstance(subkey, list):
+        return tuple(subkey)
+    return subkey
+
+
+class CachePolicy:
+    """Expiration and version of the entries of a cache namespace.
+
+    ``ttl`` applies to regular values and ``negative_ttl`` to cached
+    exceptions (failed lookups), both in seconds, None meaning forever.
+    Entries written with another ``version`` are treated as missing.
+    """
+
+    def __init__(self, ttl=None, negative_ttl=None, version=1):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.version = version
+
+    def expires(self, value, now):
+        ttl = self.negative_ttl if isinstance(value, Exception) else self.ttl
+        if ttl is None:
+            return None
+        return now + ttl
+
+    def is_valid(self, version, expires, now):
+        return version == self.version and (expires is None or expires > now)
+
+
+DEFAULT_POLICY = CachePolicy()
+
+
+class DiskCache(Cache):
+    """Cache stored in an SQLite database, one row per key.
+
+    Sub-keys must be JSON serializable (tuples are stored as lists and
+    returned as tuples), values are pickled.
+
+    ``policies`` maps namespaces (None for plain keys) to a CachePolicy.
+    Expired and outdated entries are deleted when they are read. With
+    ``max_items`` set, the oldest namespaced items are evicted once the
+    cache grows past it.
+
+    The database is stored in ``<base_dir>/<cache_id>`` (by default in the
+    temporary directory) and can be shared by several processes: writes
+    are SQLite transactions, in WAL mode readers do not block the writer,
+    and a writer waits up to ``timeout`` seconds for another one to finish.
+    """
+
+    SCHEMA_VERSION = 1
+    ITER_BATCH = 1000
+
+    def __init__(self, cache_id, policies=None, max_items=None, evict_every=1000, base_dir=None, timeout=60.0):
+        if not re.match("^[a-zA-Z0-9-_]+$", cache_id):
+            raise ValueError("Invalid cache id: {}".format(cache_id))
+
+        self.cache_dir = pjoin(base_dir or tempfile.gettempdir(), cache_id)
+        self._ensure_cache_dir()
+        self.db_path = pjoin(self.cache_dir, "cache.sqlite")
+        self.policies = policies or {}
+        self.max_items = max_items
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._create_tables()
+
+    def _ensure_cache_dir(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _create_tables(self):
+        with self._lock, self._conn:
+            # taking the write lock first, so that only one process creates or migrates the tables
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "namespace TEXT NOT NULL, subkey TEXT NOT NULL, value BLOB NOT NULL, "
+                "PRIMARY KEY (namespace, subkey))"
+            )
+            schema_version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if schema_version < 1:
+                # entries of caches created before versioning are kept as version 1
+                for table in ("entries", "items"):
+                    self._conn.execute("ALTER TABLE {} ADD COLUMN version INTEGER NOT NULL DEFAULT 1".format(table))
+                    self._conn.execute("ALTER TABLE {} ADD COLUMN created REAL NOT NULL DEFAULT 0".format(table))
+                    self._conn.execute("ALTER TABLE {} ADD COLUMN expires REAL".format(table))
+                self._conn.execute("CREATE INDEX IF NOT EXISTS items_created ON items (created)")
+                self._conn.execute("PRAGMA user_version = {}".format(self.SCHEMA_VERSION))
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def get_policy(self, namespace):
+        return self.policies.get(namespace, DEFAULT_POLICY)
+
+    def _fetchone(self, query, params):
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
+
+    def _execute(self, query, params):
+        with self._lock, self._conn:
+            return self._conn.execute(query, params).rowcount
+
+    def _entry_row(self, key, value, now):
+        policy = self.get_policy(None)
+        return (key, pickle.dumps(value), policy.version, now, policy.expires(value, now))
+
+    def _item_row(self, namespace, subkey, value, now):
+        policy = self.get_policy(namespace)
+        return (namespace, _encode_subkey(subkey), pickle.dumps(value), policy.version, now, policy.expires(value, now))
+
+    def _after_write(self, count):
+        if self.max_items is None:
+            return
+        self._writes += count
+        if self._writes >= self.evict_every:
+            self.evict()
+
+    def evict(self):
+        """Delete expired items, then the oldest ones above max_items."""
+        with self._lock, self._conn:
+            self._writes = 0
+            self._conn.execute("DELETE FROM items WHERE expires <= ?", (time.time(),))
+            if self.max_items is None:
+                return
+            count = self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            if count > self.max_items:
+                self._conn.execute(
+                    "DELETE FROM items WHERE rowid IN (SELECT rowid FROM items ORDER BY created LIMIT ?)",
+                    (count - self.max_items,)
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record_stats(self, hits, misses):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                [("hits", hits), ("misses", misses)]
+            )
+
+    def stats(self):
+        """Return the number of entries, items per namespace, lookups and size on disk."""
+        now = time.time()
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            namespaces = dict(self._conn.execute(
+                "SELECT namespace, COUNT(*) FROM items GROUP BY namespace ORDER BY namespace"
+            ).fetchall())
+            expired = self._conn.execute("SELECT COUNT(*) FROM items WHERE expires <= ?", (now,)).fetchone()[0]
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+
+        size = 0
+        for suffix in ("", "-wal"):
+            if os.path.exists(self.db_path + suffix):
+                size += os.path.getsize(self.db_path + suffix)
+        return {
+            "path": self.db_path,
+            "size": size,
+            "entries": entries,
+            "items": namespaces,
+            "expired": expired,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+    def compact(self):
+        """Delete expired and outdated rows, evict above max_items and shrink the database file.
+
+        Returns the number of deleted rows.
+        """
+        now = time.time()
+        with self._lock:
+            before = self._count_rows()
+            with self._conn:
+                self._conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+                self._conn.execute("DELETE FROM entries WHERE version != ?", (self.get_policy(None).version,))
+                for namespace in list(self._namespaces()):
+                    self._conn.execute(
+                        "DELETE FROM items WHERE namespace = ? AND version != ?",
+                        (namespace, self.get_policy(namespace).version)
+                    )
+            self.evict()
+            deleted = before - self._count_rows()
+            self._conn.execute("VACUUM")
+            # VACUUM writes the new pages to the WAL, copy them back to the database file
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def _count_rows(self):
+        return (self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] +
+                self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+
+    def _namespaces(self):
+        for row in self._conn.execute("SELECT DISTINCT namespace FROM items").fetchall():
+            yield row[0]
+
+    def export_snapshot(self, path):
+        """Write a copy of the database to path, replacing it atomically."""
+        tmp_path = "{}.tmp{}".format(path, os.getpid())
+        snapshot = sqlite3.connect(tmp_path)
+        try:
+            with self._lock:
+                self._conn.backup(snapshot)
+        finally:
+            snapshot.close()
+        os.replace(tmp_path, path)
+
+    def import_snapshot(self, path):
+        """Merge the entries of a snapshot written by export_snapshot.
+
+        Entries present in both are replaced only by newer ones. Returns the
+        number of rows in the snapshot.
+        """
+        # attaching a missing file would create an empty database
+        if not os.path.isfile(path):
+            raise ValueError("No such cache snapshot: {}".format(path))
+
+        with self._lock:
+            self._conn.execute("ATTACH DATABASE ? AS snapshot", (path,))
+            try:
+                version = self._conn.execute("PRAGMA snapshot.user_version").fetchone()[0]
+                if version != self.SCHEMA_VERSION:
+                    raise ValueError("Incompatible cache snapshot {} (version {})".format(path, version))
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT INTO entries (key, value, version, created, expires) "
+                        "SELECT key, value, version, created, expires FROM snapshot.entries WHERE true "
+                        "ON CONFLICT (key) DO UPDATE SET value = excluded.value, version = excluded.version, "
+                        "created = excluded.created, expires = excluded.expires "
+                        "WHERE excluded.created > entries.created"
+                    )
+                    self._conn.execute(
+                        "INSERT INTO items (namespace, subkey, value, version, created, expires) "
+                        "SELECT namespace, subkey, value, version, created, expires FROM snapshot.items WHERE true "
+                        "ON CONFLICT (namespace, subkey) DO UPDATE SET value = excluded.value, "
+                        "version = excluded.version, created = excluded.created, expires = excluded.expires "
+                        "WHERE excluded.created > items.created"
+                    )
+                    return (self._conn.execute("SELECT COUNT(*) FROM snapshot.entries").fetchone()[0] +
+                            self._conn.execute("SELECT COUNT(*) FROM snapshot.items").fetchone()[0])
+            finally:
+                self._conn.execute("DETACH DATABASE snapshot")
+
+    def haskey(self, key):
+        nodefault = NoDefault()
+        return self.get(key, nodefault) is not nodefault
+
+    def get(self, key, default=None):
+        row = self._fetchone("SELECT value, version, expires FROM entries WHERE key = ?", (key,))
+        if row is None:
+            return default
+        if not self.get_policy(None).is_valid(row[1], row[2], time.time()):
+            self._execute("DELETE FROM entries WHERE key = ?", (key,))
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        self._execute(
+            "INSERT OR REPLACE INTO entries (key, value, version, created, expires) VALUES (?, ?, ?, ?, ?)",
+            self._entry_row(key, value, time.time())
+        )
+
+    def set_many(self, mapping):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, version, created, expires) VALUES (?, ?, ?, ?, ?)",
+                [self._entry_row(key, value, now) for key, value in mapping.items()]
+            )
+
+    def remove(self, key):
+        if not self._execute("DELETE FROM entries WHERE key = ?", (key,)):
+            raise KeyError(key)
+
+    def keys(self):
+        policy = self.get_policy(None)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM entries WHERE version = ? AND (expires IS NULL OR expires > ?) ORDER BY key",
+                (policy.version, time.time())
+            ).fetchall()
+        for row in rows:
+            yield row[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM items")
+
+    def has_item(self, namespace, subkey):
+        nodefault = NoDefault()
+        return self.get_item(namespace, subkey, nodefault) is not nodefault
+
+    def get_item(self, namespace, subkey, default=None):
+        encoded = _encode_subkey(subkey)
+        row = self._fetchone(
+            "SELECT value, version, expires FROM items WHERE namespace = ? AND subkey = ?",
+            (namespace, encoded)
+        )
+        if row is None:
+            return default
+        if not self.get_policy(namespace).is_valid(row[1], row[2], time.time()):
+            self._execute("DELETE FROM items WHERE namespace = ? AND subkey = ?", (namespace, encoded))
+            return default
+        return pickle.loads(row[0])
+
+    def set_item(self, namespace, subkey, value):
+        self._execute(
+            "INSERT OR REPLACE INTO items (namespace, subkey, value, version, created, expires) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            self._item_row(namespace, subkey, value, time.time())
+        )
+        self._after_write(1)
+
+    def set_items(self, namespace, items):
+        now = time.time()
+        rows = [self._item_row(namespace, subkey, value, now) for subkey, value in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO items (namespace, subkey, value, version, created, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        self._after_write(len(rows))
+
+    def remove_item(self, namespace, subkey):
+        deleted = self._execute(
+            "DELETE FROM items WHERE namespace = ? AND subkey = ?",
+            (namespace, _encode_subkey(subkey))
+        )
+        if not deleted:
+            raise KeyError((namespace, subkey))
+
+    def iter_items(self, namespace):
+        """Yield the items of a namespace in insertion order, reading them in batches."""
+        policy = self.get_policy(namespace)
+        now = time.time()
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, subkey, value FROM items "
+                    "WHERE namespace = ? AND version = ? AND (expires IS NULL OR expires > ?) AND rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (namespace, policy.version, now, last_rowid, self.ITER_BATCH)
+                ).fetchall()
+            if not rows:
+                return
+            for _, subkey, value in rows:
+                yield (_decode_subkey(subkey), pickle.loads(value))
+            last_rowid = rows[-1][0]
+
+
+class TieredCache(Cache):
+    """Size-bounded in-memory LRU layer in front of another cache.
+
+    Writes are kept in memory and written back to the backend in batches,
+    when ``flush_every`` dirty entries are pending, on ``flush()`` or at
+    interpreter exit. Batches given to ``set_items()`` are written straight
+    to the backend. Lookups found in memory or in the backend count as
+    hits, the counters are added to the backend's on flush.
+    """
+
+    _PLAIN = None
+
+    def __init__(self, backend, max_entries=10000, flush_every=500):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self._entries = OrderedDict()
+        self._dirty = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._recorded_hits = 0
+        self._recorded_misses = 0
+        atexit.register(self.flush)
+
+    def _lookup(self, namespace, subkey, default):
+        cache_key = (namespace, subkey)
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return self._entries[cache_key]
+            if cache_key in self._dirty:
+                self.hits += 1
+                value = self._dirty[cache_key]
+                self._store(cache_key, value)
+                return value
+
+            nodefault = NoDefault()
+            if namespace is self._PLAIN:
+                value = self.backend.get(subkey, nodefault)
+            else:
+                value = self.backend.get_item(namespace, subkey, nodefault)
+            if value is nodefault:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._store(cache_key, value)
+            return value
+
+    def _store(self, cache_key, value):
+        self._entries[cache_key] = value
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _write(self, namespace, subkey, value):
+        cache_key = (namespace, subkey)
+        with self._lock:
+            self._store(cache_key, value)
+            self._dirty[cache_key] = value
+            if len(self._dirty) >= self.flush_every:
+                self.flush()
+
+    def _discard(self, namespace, subkey):
+        cache_key = (namespace, subkey)
+        with self._lock:
+            self._entries.pop(cache_key, None)
+            self._dirty.pop(cache_key, None)
+
+    def flush(self):
+        with self._lock:
+            if self.hits != self._recorded_hits or self.misses != self._recorded_misses:
+                self.backend.record_stats(self.hits - self._recorded_hits, self.misses - self._recorded_misses)
+                self._recorded_hits = self.hits
+                self._recorded_misses = self.misses
+            if not self._dirty:
+                return
+            plain = {}
+            namespaces = OrderedDict()
+            for (namespace, subkey), value in self._dirty.items():
+                if namespace is self._PLAIN:
+                    plain[subkey] = value
+                else:
+                    namespaces.setdefault(namespace, []).append((subkey, value))
+
+            if plain:
+                self.backend.set_many(plain)
+            for namespace, items in namespaces.items():
+                self.backend.set_items(namespace, items)
+            self._dirty.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "dirty": len(self._dirty),
+            }
+
+    def haskey(self, key):
+        nodefault = NoDefault()
+        return self._lookup(self._PLAIN, key, nodefault) is not nodefault
+
+    def get(self, key, default=None):
+        return self._lookup(self._PLAIN, key, default)
+
+    def set(self, key, value):
+        self._write(self._PLAIN, key, value)
+
+    def remove(self, key):
+        with self._lock:
+            pending = (self._PLAIN, key) in self._dirty
+            self._discard(self._PLAIN, key)
+            try:
+                self.backend.remove(key)
+            except KeyError:
+                if not pending:
+                    raise
+
+    def keys(self):
+        self.flush()
+        return self.backend.keys()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty.clear()
+            self.backend.clear()
+
+    def has_item(self, namespace, subkey):
+        nodefault = NoDefault()
+        return self._lookup(namespace, subkey, nodefault) is not nodefault
+
+    def get_item(self, namespace, subkey, default=None):
+        return self._lookup(namespace, subkey, default)
+
+    def set_item(self, namespace, subkey, value):
+        self._write(namespace, subkey, value)
+
+    def set_items(self, namespace, items):
+        # batches are written through, so that streamed data does not fill the memory layer
+        items = list(items)
+        with self._lock:
+            for subkey, _ in items:
+                self._discard(namespace, subkey)
+            self.backend.set_items(namespace, items)
+
+    def remove_item(self, namespace, subkey):
+        with self._lock:
+            pending = (namespace, subkey) in self._dirty
+            self._discard(namespace, subkey)
+            try:
+                self.backend.remove_item(namespace, subkey)
+            except KeyError:
+                if not pending:
+                    raise
+
+    def iter_items(self, namespace):
+        self.flush()
+        return self.backend.iter_items(namespace)
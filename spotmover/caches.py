@@ -0,0 +1,36 @@
+from spotmover.cache import CachePolicy, DiskCache
+
+DAY = 24 * 60 * 60
+
+
+class CacheSpec:
+    """Id, namespace policies and size cap of the on-disk cache of a provider.
+
+    Kept apart from the providers, so the caches can be opened without
+    importing the provider SDKs.
+    """
+
+    def __init__(self, cache_id, policies=None, max_items=None):
+        self.cache_id = cache_id
+        self.policies = policies or {}
+        self.max_items = max_items
+
+    def open(self, base_dir=None):
+        return DiskCache(self.cache_id, self.policies, self.max_items, base_dir=base_dir)
+
+
+GOOGLE_CACHE = CacheSpec("spotmover-google")
+
+# failed lookups are retried after a week, as the catalog keeps growing;
+# cached playlist contents are checked against the snapshot id of the playlist
+SPOTIFY_CACHE = CacheSpec("spotmover-spotify", {
+    "albums": CachePolicy(ttl=180 * DAY, negative_ttl=7 * DAY),
+    "find_song": CachePolicy(ttl=180 * DAY, negative_ttl=7 * DAY),
+    "album_tracks": CachePolicy(ttl=180 * DAY),
+    "playlist_tracks": CachePolicy(ttl=180 * DAY),
+}, max_items=500000)
+
+CACHES = {
+    "google": GOOGLE_CACHE,
+    "spotify": SPOTIFY_CACHE,
+}
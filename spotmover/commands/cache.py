@@ -0,0 +1,97 @@
+# pylint: disable=W1202,C0301
+
+import logging
+
+import click
+
+from spotmover.caches import CACHES
+from spotmover.dump import load_dump
+from .spotify import get_spotify_provider_cls
+
+logger = logging.getLogger(__name__)
+
+
+def open_cache(ctx, name):
+    return CACHES[name].open(ctx.obj["CACHE_DIR"])
+
+
+@click.command("stats")
+@click.argument("names", nargs=-1, type=click.Choice(sorted(CACHES)))
+@click.pass_context
+def cache_stats(ctx, names):
+    for name in names or sorted(CACHES):
+        stats = open_cache(ctx, name).stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = 100.0 * stats["hits"] / lookups if lookups else 0.0
+        logger.info("{} ({}):".format(name, stats["path"]))
+        logger.info("    size: {:.1f} MiB".format(stats["size"] / 2 ** 20))
+        logger.info("    entries: {}".format(stats["entries"]))
+        for namespace, count in stats["items"].items():
+            logger.info("    {}: {}".format(namespace, count))
+        logger.info("    expired: {}".format(stats["expired"]))
+        logger.info("    lookups: {}, hit rate: {:.1f}%".format(lookups, hit_rate))
+
+
+@click.command("compact")
+@click.argument("names", nargs=-1, type=click.Choice(sorted(CACHES)))
+@click.pass_context
+def cache_compact(ctx, names):
+    for name in names or sorted(CACHES):
+        disk_cache = open_cache(ctx, name)
+        size = disk_cache.stats()["size"]
+        deleted = disk_cache.compact()
+        logger.info("{}: {} entries deleted, {:.1f} MiB -> {:.1f} MiB".format(
+            name, deleted, size / 2 ** 20, disk_cache.stats()["size"] / 2 ** 20
+        ))
+
+
+@click.command("export")
+@click.argument("name", type=click.Choice(sorted(CACHES)))
+@click.argument("output")
+@click.pass_context
+def cache_export(ctx, name, output):
+    open_cache(ctx, name).export_snapshot(output)
+    logger.info("Cache exported to {}".format(output))
+
+
+@click.command("import")
+@click.argument("name", type=click.Choice(sorted(CACHES)))
+@click.argument("input_path")
+@click.pass_context
+def cache_import(ctx, name, input_path):
+    try:
+        count = open_cache(ctx, name).import_snapshot(input_path)
+    except ValueError as err:
+        raise click.UsageError(str(err))
+    logger.info("Imported {} entries from {}".format(count, input_path))
+
+
+@click.command("warm")
+@click.argument("input_path")
+@click.option("--no-album-first", is_flag=True, help="Search playlist tracks one by one instead of by album")
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=32, help="Number of concurrent lookups")
+@click.option("--rate", type=click.FloatRange(min=0, min_open=True), default=10.0, help="Maximum API requests per second")
+@click.option("--backend", type=click.Choice(["sync", "async"]), default="sync",
+              help="Use threads (sync) or asyncio (async, requires aiohttp) for API calls")
+@click.pass_context
+def cache_warm(ctx, input_path, no_album_first, jobs, rate, backend):
+    config = ctx.obj["CONFIG"]
+    if not config.spotify:
+        raise click.UsageError("'spotify' section is missing from config")
+
+    provider = get_spotify_provider_cls(backend, False)(
+        jobs=jobs,
+        rate=rate,
+        album_first=not no_album_first,
+        cache_dir=ctx.obj["CACHE_DIR"]
+    )
+    provider.authenticate(
+        config.spotify.username,
+        config.spotify.client_id,
+        config.spotify.client_secret,
+        config.spotify.redirect_uri
+    )
+    provider.warm_cache(load_dump(input_path))
+
+    stats = provider.limiter.stats()
+    logger.info("API calls: {calls}, retries: {retries}, throttled: {throttled}".format(**stats))
@@ -0,0 +1,56 @@
+# pylint: disable=W1202,C0301
+
+import json
+import logging
+
+from spotmover.dump import write_ndjson
+
+logger = logging.getLogger(__name__)
+
+
+def write_dump(provider, origin, output, output_format=None):
+    """Dump provider to output, streaming it if the format is ndjson."""
+    if output_format is None:
+        output_format = "ndjson" if output.endswith(".ndjson") else "json"
+
+    if output_format == "ndjson":
+        # written as it is fetched, one page of songs and one playlist at a time
+        data = provider.stream()
+        with open(output, "w") as outfile:
+            write_ndjson(outfile, origin, data["songs"], data["playlists"])
+    else:
+        data = provider.dump()
+        data["origin"] = origin
+        with open(output, "w") as outfile:
+            json.dump(data, outfile, indent=4)
+
+
+def write_profile(profiler, summary, json_path):
+    report = profiler.report()
+    if json_path:
+        with open(json_path, "w") as outfile:
+            json.dump(report, outfile, indent=4)
+        logger.info("Profile written to {}".format(json_path))
+    if not summary:
+        return
+
+    from texttable import Texttable
+
+    table = Texttable(max_width=0)
+    table.set_deco(Texttable.HEADER)
+    table.set_cols_align(["l", "r", "r", "r", "r", "r", "l"])
+    table.set_cols_dtype(["t"] * 7)
+    table.header(["operation", "calls", "errors", "total (s)", "mean (ms)", "max (ms)", "latency"])
+    for name, stats in report["operations"].items():
+        histogram = " ".join("{}:{}".format(bucket, count) for bucket, count in stats["histogram"].items() if count)
+        table.add_row([
+            name, stats["count"], stats["errors"], "{:.2f}".format(stats["total"]),
+            "{:.1f}".format(stats["mean"] * 1000), "{:.1f}".format(stats["max"] * 1000), histogram
+        ])
+    logger.info(table.draw())
+    logger.info("Wall time: {:.1f}s".format(report["wall_time"]))
+    if "cache" in report:
+        logger.info("Cache hits: {hits}, misses: {misses}, hit ratio: {hit_ratio:.1%}".format(**report["cache"]))
+    if "rate_limiter" in report:
+        logger.info("Retries: {retries}, throttled: {throttled}, throttle time: {throttle_time:.1f}s, "
+                    "backoff time: {backoff_time:.1f}s, rate limit wait: {wait_time:.1f}s".format(**report["rate_limiter"]))
@@ -0,0 +1,45 @@
+# pylint: disable=W1202,C0301
+
+import logging
+
+import click
+
+from spotmover.providers.base import ProviderAuthError
+from spotmover.profiling import Profiler
+from .common import write_dump, write_profile
+
+logger = logging.getLogger(__name__)
+
+
+@click.command("google")
+@click.option("-o", "--output", help="Output file to dump", required=True)
+@click.option("--no-cache", is_flag=True, help="Do not use on-disk cache")
+@click.option("--format", "output_format", type=click.Choice(["json", "ndjson"]),
+              help="Output format, the default depends on the extension of the output file")
+@click.option("--profile", is_flag=True, help="Print the time spent in API calls and cache accesses at the end")
+@click.option("--profile-json", help="Write the profile to this file as JSON")
+@click.pass_context
+def dump_google(ctx, output, no_cache, output_format, profile, profile_json):
+    config = ctx.obj["CONFIG"]
+    if not config.google:
+        raise click.UsageError("'google' section is missing from config")
+
+    from spotmover.providers.google import GoogleProvider, CachedGoogleProvider
+
+    profiler = Profiler() if profile or profile_json else None
+    if no_cache:
+        provider = GoogleProvider(profiler=profiler)
+    else:
+        provider = CachedGoogleProvider(cache_dir=ctx.obj["CACHE_DIR"], profiler=profiler)
+    provider.lazy_authenticate(config.google.username, config.google.password)
+
+    logger.info("Collecting data")
+    try:
+        write_dump(provider, "google", output, output_format)
+    except ProviderAuthError:
+        ctx.abort()
+    finally:
+        if profiler is not None:
+            write_profile(profiler, profile, profile_json)
+
+    logger.info("Dump completed to {}".format(output))
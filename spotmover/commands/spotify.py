@@ -0,0 +1,230 @@
+# pylint: disable=W1202,C0301
+
+import json
+import logging
+
+import click
+
+from spotmover.dump import Dump, load_dump
+from spotmover.journal import Journal
+from spotmover.matching import MATCHERS, get_matcher
+from spotmover.matchpool import MatchPool
+from spotmover.profiling import Profiler
+from .common import write_dump, write_profile
+
+logger = logging.getLogger(__name__)
+
+# concurrent lookups of each backend when -j is not given, asyncio handles many more requests in flight than threads
+DEFAULT_JOBS = {"sync": 1, "async": 100}
+
+
+def edit_albums(albums):
+    from texttable import Texttable
+
+    table = Texttable(max_width=0)
+    table.set_deco(Texttable.VLINES)
+    table.add_rows(albums, header=False)
+    albums_text = click.edit(table.draw())
+    if albums_text is None:
+        return albums
+
+    retval = []
+    for line in albums_text.split("\n"):
+        if line == "" or line.startswith("#"):
+            continue
+        retval.append(tuple([x.strip() for x in line.split("|")]))
+
+    return retval
+
+
+def get_spotify_provider_cls(backend, no_cache):
+    if backend == "async":
+        try:
+            from spotmover.providers.spotify.aio import AsyncSpotifyProvider, CachedAsyncSpotifyProvider
+        except ImportError:
+            raise click.UsageError("The async backend requires the aiohttp package")
+        return AsyncSpotifyProvider if no_cache else CachedAsyncSpotifyProvider
+
+    from spotmover.providers.spotify import SpotifyProvider, CachedSpotifyProvider
+    return SpotifyProvider if no_cache else CachedSpotifyProvider
+
+
+@click.command("spotify")
+@click.argument("input_path")
+@click.option("-f", "--force", is_flag=True,
+              help="No interactive use: import every playlist, even with songs not found, without asking")
+@click.option("-p", "--force-playlists", is_flag=True, help="Re-create playlists even if they exist")
+@click.option("-s", "--sync-playlists", is_flag=True, help="Add the missing tracks to playlists which already exist")
+@click.option("--remove-extra", is_flag=True, help="With --sync-playlists, remove tracks which are not in the dump")
+@click.option("--no-album-first", is_flag=True, help="Search playlist tracks one by one instead of by album")
+@click.option("--match", "match_name", type=click.Choice(sorted(MATCHERS)), default="normalized",
+              help="How search results are matched against the dump")
+@click.option("--match-threshold", type=click.FloatRange(0, 1), help="Minimum score of a match (default depends on --match)")
+@click.option("--match-workers", type=click.IntRange(min=0), default=0,
+              help="Number of processes to match search results in (default: match in the main process)")
+@click.option("--no-cache", is_flag=True, help="Do not use on-disk cache")
+@click.option("-j", "--jobs", type=click.IntRange(min=1),
+              help="Number of concurrent lookups (default: 1, 100 with --backend async)")
+@click.option("--rate", type=click.FloatRange(min=0, min_open=True), default=10.0, help="Maximum API requests per second")
+@click.option("--backend", type=click.Choice(["sync", "async"]), default="sync",
+              help="Use threads (sync) or asyncio (async, requires aiohttp) for API calls")
+@click.option("--journal", "journal_path", help="Journal file to resume an interrupted load from (default: <input>.journal)")
+@click.option("--no-journal", is_flag=True, help="Do not record the progress in a journal")
+@click.option("--profile", is_flag=True, help="Print the time spent in API calls and cache accesses at the end")
+@click.option("--profile-json", help="Write the profile to this file as JSON")
+@click.pass_context
+def load_spotify(ctx, input_path, force, force_playlists, sync_playlists, remove_extra, no_album_first, match_name,
+                 match_threshold, match_workers, no_cache, jobs, rate, backend, journal_path, no_journal,
+                 profile, profile_json):
+    config = ctx.obj["CONFIG"]
+    if not config.spotify:
+        raise click.UsageError("'spotify' section is missing from config")
+    if force_playlists and sync_playlists:
+        raise click.UsageError("--force-playlists and --sync-playlists are mutually exclusive")
+    if remove_extra and not sync_playlists:
+        raise click.UsageError("--remove-extra requires --sync-playlists")
+
+    data = load_dump(input_path)
+
+    if data.streaming:
+        logger.info("Streaming collection from {}".format(input_path))
+    else:
+        logger.info("Collection loaded with {} songs and {} playlists".format(len(data.songs), len(data.playlists)))
+
+    albums = data.group_songs_by_albums(data.songs)
+    if not force:
+        albums = edit_albums(sorted(albums))
+    elif not data.streaming:
+        albums = sorted(albums)
+
+    if next(iter(data.albums), None) is not None:
+        raise NotImplementedError()
+
+    albums = ({"artist": x[0], "album": x[1]} for x in albums)
+    data = Dump({"songs": [], "albums": albums, "playlists": data.playlists, "origin": data.origin})
+
+    provider_cls = get_spotify_provider_cls(backend, no_cache)
+    if jobs is None:
+        jobs = DEFAULT_JOBS[backend]
+
+    if no_journal:
+        journal = Journal()
+    else:
+        journal = Journal(journal_path or input_path + ".journal")
+
+    matcher = get_matcher(match_name, match_threshold)
+    if match_workers:
+        matcher = MatchPool(matcher, match_workers)
+
+    profiler = Profiler() if profile or profile_json else None
+    provider = provider_cls(
+        jobs=jobs,
+        rate=rate,
+        journal=journal,
+        album_first=not no_album_first,
+        matcher=matcher,
+        cache_dir=ctx.obj["CACHE_DIR"],
+        profiler=profiler
+    )
+
+    provider.authenticate(
+        config.spotify.username,
+        config.spotify.client_id,
+        config.spotify.client_secret,
+        config.spotify.redirect_uri
+    )
+
+    try:
+        if profiler is None:
+            provider.load_songs(data)
+            provider.load_playlists(data, force, force_playlists, sync_playlists, remove_extra)
+        else:
+            with profiler.timer("load_songs"):
+                provider.load_songs(data)
+            with profiler.timer("load_playlists"):
+                provider.load_playlists(data, force, force_playlists, sync_playlists, remove_extra)
+    finally:
+        journal.close()
+        if match_workers:
+            matcher.close()
+        if profiler is not None:
+            write_profile(profiler, profile, profile_json)
+
+    stats = provider.limiter.stats()
+    logger.info("API calls: {calls}, retries: {retries}, throttled: {throttled}, "
+                "throttle time: {throttle_time:.1f}s, rate limit wait: {wait_time:.1f}s".format(**stats))
+
+
+@click.command("spotify")
+@click.option("-o", "--output", help="Output file to dump", required=True)
+@click.option("--no-cache", is_flag=True, help="Do not use on-disk cache")
+@click.option("--format", "output_format", type=click.Choice(["json", "ndjson"]),
+              help="Output format, the default depends on the extension of the output file")
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=4, help="Number of concurrent requests")
+@click.option("--rate", type=click.FloatRange(min=0, min_open=True), default=10.0, help="Maximum API requests per second")
+@click.option("--profile", is_flag=True, help="Print the time spent in API calls and cache accesses at the end")
+@click.option("--profile-json", help="Write the profile to this file as JSON")
+@click.pass_context
+def dump_spotify(ctx, output, no_cache, output_format, jobs, rate, profile, profile_json):
+    config = ctx.obj["CONFIG"]
+    if not config.spotify:
+        raise click.UsageError("'spotify' section is missing from config")
+
+    provider_cls = get_spotify_provider_cls("sync", no_cache)
+    profiler = Profiler() if profile or profile_json else None
+    provider = provider_cls(jobs=jobs, rate=rate, cache_dir=ctx.obj["CACHE_DIR"], profiler=profiler)
+    provider.authenticate(
+        config.spotify.username,
+        config.spotify.client_id,
+        config.spotify.client_secret,
+        config.spotify.redirect_uri
+    )
+
+    logger.info("Collecting data")
+    try:
+        write_dump(provider, "spotify", output, output_format)
+    finally:
+        if profiler is not None:
+            write_profile(profiler, profile, profile_json)
+
+    logger.info("Dump completed to {}".format(output))
+
+
+@click.command("spotify")
+@click.argument("input_path")
+@click.option("-o", "--output", help="Report file (default: <input>.verify.json)")
+@click.option("--match", "match_name", type=click.Choice(["exact", "normalized"]), default="normalized",
+              help="How the names of the dump and of the library are compared")
+@click.option("--no-cache", is_flag=True, help="Do not use on-disk cache")
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=4, help="Number of concurrent requests")
+@click.option("--rate", type=click.FloatRange(min=0, min_open=True), default=10.0, help="Maximum API requests per second")
+@click.pass_context
+def verify_spotify(ctx, input_path, output, match_name, no_cache, jobs, rate):
+    config = ctx.obj["CONFIG"]
+    if not config.spotify:
+        raise click.UsageError("'spotify' section is missing from config")
+
+    from spotmover.verify import reconcile
+
+    data = load_dump(input_path)
+    provider_cls = get_spotify_provider_cls("sync", no_cache)
+    provider = provider_cls(jobs=jobs, rate=rate, cache_dir=ctx.obj["CACHE_DIR"])
+    provider.authenticate(
+        config.spotify.username,
+        config.spotify.client_id,
+        config.spotify.client_secret,
+        config.spotify.redirect_uri
+    )
+
+    report = reconcile(data, provider, jobs, get_matcher(match_name).key)
+    output = output or input_path + ".verify.json"
+    with open(output, "w") as outfile:
+        json.dump(report, outfile, indent=4)
+
+    summary = report["summary"]
+    logger.info("Albums: {complete} complete, {partial} partial, {missing} missing of {total}, "
+                "{extra} not in the dump".format(**summary["albums"]))
+    logger.info("Songs: {matched} of {total} found, {missing} missing".format(**summary["songs"]))
+    logger.info("Playlists: {complete} complete, {partial} partial, {missing} missing of {total}, "
+                "{extra} not in the dump".format(**summary["playlists"]))
+    logger.info("Report written to {}".format(output))
@@ -0,0 +1,96 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parallel_map(func, items, jobs=1, window=None):
+    """Apply func to every item using up to jobs threads.
+
+    Results are yielded in the order of the input, regardless of the order
+    the calls complete in. With window set, at most window calls are
+    started ahead of the result being consumed, so results do not pile up
+    in memory when the consumer is slower.
+    """
+    if jobs <= 1:
+        yield from map(func, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        if window is None:
+            yield from executor.map(func, items)
+            return
+
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class BatchWriter:
+    """Collect items and pass them to write in batches, from a background thread.
+
+    The caller keeps producing items while the previous batches are being
+    written. Batches are written in the order they were filled. At most
+    max_pending full batches are queued before add() blocks. An error
+    raised by write is re-raised by the next add() or by close().
+    """
+
+    def __init__(self, write, batch_size, max_pending=4):
+        self.write = write
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+        self._error = None
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self.write(batch)
+            except BaseException as err:  # pylint: disable=W0703
+                self._error = err
+
+    def _check_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def add(self, item):
+        self._check_error()
+        self._batch.append(item)
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def close(self, flush=True):
+        if flush and self._batch:
+            self._queue.put(self._batch)
+        self._batch = []
+        self._queue.put(None)
+        self._thread.join()
+        self._check_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+
+        # write what was collected so far, but let the original exception propagate
+        try:
+            self.close()
+        except BaseException:  # pylint: disable=W0703
+            pass
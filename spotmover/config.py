@@ -39,10 +39,13 @@ class Config:
     def __init__(self, config_dict):
         self.google = None
         self.spotify = None
+        self.cache_dir = None
         if "google" in config_dict:
             self.google = GoogleCredentials.from_dict(config_dict["google"])
         if "spotify" in config_dict:
             self.spotify = SpotifyCredentials.from_dict(config_dict["spotify"])
+        if "cache" in config_dict:
+            self.cache_dir = config_dict["cache"].get("directory")
 
     @classmethod
     def from_file(cls, path):
@@ -1,28 +1,163 @@
+import json
+from array import array
+
+
+class StringTable:
+    """Dictionary encoding of strings, each distinct value is stored once."""
+
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def add(self, value):
+        try:
+            return self._index[value]
+        except KeyError:
+            idx = self._index[value] = len(self.values)
+            self.values.append(value)
+            return idx
+
+    def find(self, value):
+        return self._index.get(value)
+
+    def __getitem__(self, idx):
+        return self.values[idx]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class SongList:
+    """Read-only sequence of songs stored as integer album and title ids.
+
+    Items are returned as ``{"artist": ..., "album": ..., "title": ...}``
+    dicts created on access.
+    """
+
+    __slots__ = ("dump", "album_ids", "title_ids")
+
+    def __init__(self, dump):
+        self.dump = dump
+        self.album_ids = array("I")
+        self.title_ids = array("I")
+
+    def append(self, song):
+        self.album_ids.append(self.dump.add_album(song["artist"], song["album"]))
+        self.title_ids.append(self.dump.titles.add(song["title"]))
+
+    def _make_song(self, album_id, title_id):
+        artist, album = self.dump.get_album(album_id)
+        return {"artist": artist, "album": album, "title": self.dump.titles[title_id]}
+
+    def __len__(self):
+        return len(self.album_ids)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._make_song(*item) for item in zip(self.album_ids[idx], self.title_ids[idx])]
+        return self._make_song(self.album_ids[idx], self.title_ids[idx])
+
+    def __iter__(self):
+        for album_id, title_id in zip(self.album_ids, self.title_ids):
+            yield self._make_song(album_id, title_id)
+
+    def filter_albums(self, album_ids):
+        """Return a new SongList without the songs of the given album ids."""
+        retval = SongList(self.dump)
+        for album_id, title_id in zip(self.album_ids, self.title_ids):
+            if album_id not in album_ids:
+                retval.album_ids.append(album_id)
+                retval.title_ids.append(title_id)
+        return retval
 
 
 class Dump:
+    """In-memory dump.
+
+    Artists, album names and titles are dictionary encoded, every (artist,
+    album) pair gets an integer album id and songs are stored as arrays of
+    album and title ids (see SongList). The ``songs``, ``playlists`` and
+    ``albums`` accessors return the records as dicts.
+    """
+
+    streaming = False
+
     def __init__(self, data):
         self.set_data(data)
 
     def set_data(self, data):
-        self.data = data
         self.origin = data["origin"]
-        if "albums" not in data:
-            data["albums"] = []
+        self.artists = StringTable()
+        self.album_names = StringTable()
+        self.titles = StringTable()
+        self._album_index = {}
+        self._album_artist_ids = array("I")
+        self._album_name_ids = array("I")
+
+        self._songs = self._encode_songs(data["songs"])
+        playlists = data["playlists"]
+        if isinstance(playlists, (list, tuple)):
+            self._playlists = [self._encode_playlist(playlist) for playlist in playlists]
+        else:
+            # streamed playlists stay lazy: each one is encoded when it is read, and can be read once
+            self._playlists = (self._encode_playlist(playlist) for playlist in playlists)
+        # explicit album selection, kept as it was given (may be a generator consumed once)
+        self._albums = data.get("albums", [])
+
+    def _encode_playlist(self, playlist):
+        return {"name": playlist["name"], "tracks": self._encode_songs(playlist["tracks"])}
+
+    def _encode_songs(self, songs):
+        retval = SongList(self)
+        for song in songs:
+            retval.append(song)
+        return retval
+
+    def add_album(self, artist, album):
+        key = (self.artists.add(artist), self.album_names.add(album))
+        try:
+            return self._album_index[key]
+        except KeyError:
+            album_id = self._album_index[key] = len(self._album_artist_ids)
+            self._album_artist_ids.append(key[0])
+            self._album_name_ids.append(key[1])
+            return album_id
+
+    def find_album(self, artist, album):
+        artist_id = self.artists.find(artist)
+        album_name_id = self.album_names.find(album)
+        return self._album_index.get((artist_id, album_name_id))
+
+    def get_album(self, album_id):
+        return (self.artists[self._album_artist_ids[album_id]], self.album_names[self._album_name_ids[album_id]])
+
+    @property
+    def data(self):
+        return {
+            "origin": self.origin,
+            "songs": list(self.songs),
+            "playlists": [{"name": x["name"], "tracks": list(x["tracks"])} for x in self.playlists],
+            "albums": self.albums,
+        }
 
     @property
     def songs(self):
-        return self.data["songs"]
+        return self._songs
 
     @property
     def playlists(self):
-        return self.data["playlists"]
+        return self._playlists
 
     @property
     def albums(self):
-        return self.data["albums"]
+        return self._albums
 
     def group_songs_by_albums(self, source):
+        if isinstance(source, SongList) and source.dump is self:
+            for album_id in dict.fromkeys(source.album_ids):
+                yield self.get_album(album_id)
+            return
+
         seen = set()
         for song in source:
             key = (song["artist"], song["album"])
@@ -33,11 +168,127 @@ class Dump:
             yield key
 
     def remove_songs_by_albums(self):
-        albums_set = set(self.albums)
-        new_songs = []
-        for song in self.data["songs"]:
-            key = (song["artist"], song["album"])
-            if key not in albums_set:
-                new_songs.append(song)
+        album_ids = set()
+        for album in self.albums:
+            if isinstance(album, dict):
+                album = (album["artist"], album["album"])
+            album_id = self.find_album(*album)
+            if album_id is not None:
+                album_ids.add(album_id)
+
+        self._songs = self._songs.filter_albums(album_ids)
+
+
+NDJSON_VERSION = 1
+
+
+def write_ndjson(outfile, origin, songs, playlists, albums=()):
+    """Write a dump as newline delimited JSON.
+
+    The first record is a header holding the origin, followed by one record
+    per album, song, playlist and playlist entry, in this order. Entries
+    follow the playlist record they belong to.
+    """
+    def write(record):
+        outfile.write(json.dumps(record))
+        outfile.write("\n")
+
+    write({"type": "header", "origin": origin, "version": NDJSON_VERSION})
+    for album in albums:
+        write(dict(album, type="album"))
+    for song in songs:
+        write(dict(song, type="song"))
+    for playlist in playlists:
+        write({"type": "playlist", "name": playlist["name"]})
+        for track in playlist["tracks"]:
+            write(dict(track, type="playlist_track"))
+
+
+def _read_header(path):
+    with open(path, "r") as infile:
+        line = infile.readline()
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(record, dict) and record.get("type") == "header":
+        return record
+    return None
+
+
+class StreamDump(Dump):
+    """Dump read lazily from a newline delimited JSON file.
+
+    ``songs``, ``albums`` and ``playlists`` are generators reading the file
+    again on each access, so only one playlist is kept in memory at a time.
+    """
+
+    streaming = True
+
+    def __init__(self, path, header=None):  # pylint: disable=W0231
+        self.path = path
+        if header is None:
+            header = _read_header(path)
+        if header is None:
+            raise ValueError("Not a streaming dump: {}".format(path))
+        if header.get("version", NDJSON_VERSION) > NDJSON_VERSION:
+            raise ValueError("Unsupported dump version: {}".format(header["version"]))
+        self.origin = header["origin"]
+        self._removed_albums = frozenset()
+
+    def _iter_records(self):
+        with open(self.path, "r") as infile:
+            next(infile)
+            for line in infile:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _iter_type(self, record_type):
+        for record in self._iter_records():
+            if record.pop("type") == record_type:
+                yield record
+
+    @property
+    def songs(self):
+        for song in self._iter_type("song"):
+            if (song["artist"], song["album"]) not in self._removed_albums:
+                yield song
+
+    @property
+    def albums(self):
+        # albums come right after the header, the rest of the file is not read
+        for record in self._iter_records():
+            if record.pop("type") != "album":
+                return
+            yield record
+
+    @property
+    def playlists(self):
+        playlist = None
+        for record in self._iter_records():
+            record_type = record.pop("type")
+            if record_type == "playlist":
+                if playlist is not None:
+                    yield playlist
+                playlist = {"name": record["name"], "tracks": []}
+            elif record_type == "playlist_track":
+                playlist["tracks"].append(record)
+
+        if playlist is not None:
+            yield playlist
+
+    def remove_songs_by_albums(self):
+        # the songs of the albums are skipped while reading them
+        self._removed_albums = frozenset(
+            (album["artist"], album["album"]) if isinstance(album, dict) else tuple(album) for album in self.albums
+        )
+
+
+def load_dump(path):
+    """Load a dump file, streaming it if it is in newline delimited format."""
+    header = _read_header(path)
+    if header is not None:
+        return StreamDump(path, header)
 
-        self.data["songs"] = new_songs
+    with open(path, "r") as infile:
+        return Dump(json.load(infile))
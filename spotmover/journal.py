@@ -0,0 +1,123 @@
+import os
+import json
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """Append-only record of the completed steps of a load.
+
+    Every step is written as one JSON line and synced to disk before the
+    next step starts, so a rerun with the same journal can skip everything
+    which was done before. With ``path`` set to None the journal is kept in
+    memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.current_albums = None
+        self.saved_album_ids = set()
+        self.songs_done = False
+        self.current_playlists = None
+        self.playlists = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+        if path is not None:
+            self._replay()
+            self._file = open(path, "a")
+
+    def _replay(self):
+        try:
+            infile = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+
+        count = 0
+        # end of the last line written in full, what follows is cut off before appending
+        complete_size = 0
+        with infile:
+            for line in infile:
+                if not line.endswith(b"\n"):
+                    # last line of an interrupted run
+                    logger.warning("Ignoring incomplete journal entry in {}".format(self.path))
+                    break
+                complete_size += len(line)
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    logger.warning("Ignoring invalid journal entry in {}".format(self.path))
+                    continue
+                self._apply(record)
+                count += 1
+
+        if os.path.getsize(self.path) > complete_size:
+            with open(self.path, "r+b") as outfile:
+                outfile.truncate(complete_size)
+
+        if count:
+            logger.info("Resuming from journal {} ({} steps)".format(self.path, count))
+
+    def _playlist(self, name):
+        return self.playlists.setdefault(name, {"id": None, "added": Counter(), "done": False})
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "current_albums":
+            self.current_albums = [tuple(x) for x in record["albums"]]
+        elif op == "albums_saved":
+            self.saved_album_ids.update(record["ids"])
+        elif op == "songs_done":
+            self.songs_done = True
+        elif op == "current_playlists":
+            self.current_playlists = record["playlists"]
+        elif op == "playlist_created":
+            self._playlist(record["name"])["id"] = record["id"]
+        elif op == "tracks_added":
+            self._playlist(record["name"])["added"].update(record["ids"])
+        elif op == "playlist_done":
+            self._playlist(record["name"])["done"] = True
+        else:
+            raise ValueError("Unknown journal entry: {}".format(op))
+
+    def record(self, op, **kwargs):
+        record = {"op": op}
+        record.update(kwargs)
+        with self._lock:
+            self._apply(record)
+            if self._file is not None:
+                self._file.write(json.dumps(record))
+                self._file.write("\n")
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_playlist_id(self, name):
+        if name in self.playlists:
+            return self.playlists[name]["id"]
+        return None
+
+    def is_playlist_done(self, name):
+        return name in self.playlists and self.playlists[name]["done"]
+
+    def get_added_tracks(self, name):
+        """Return a Counter of the tracks added to playlist name so far."""
+        if name not in self.playlists:
+            return Counter()
+        return Counter(self.playlists[name]["added"])
+
+    def iter_remaining_tracks(self, name, track_ids):
+        """Yield track_ids without the ones already added to playlist name."""
+        added = self.get_added_tracks(name)
+        for track_id in track_ids:
+            if added[track_id] > 0:
+                added[track_id] -= 1
+            else:
+                yield track_id
@@ -0,0 +1,212 @@
+import re
+import unicodedata
+from functools import lru_cache
+from collections import Counter
+
+# bracketed or dash separated suffixes like "(Remastered 2011)", "[Deluxe Edition]" or "- Live"
+_VERSION_WORDS = (
+    "remaster", "remastered", "deluxe", "edition", "version", "bonus", "mono", "stereo", "live", "mix",
+    "anniversary", "expanded", "explicit", "single", "edit", "demo",
+)
+_BRACKETED_RE = re.compile(r"[\(\[]([^\)\]]*)[\)\]]")
+_DASH_SUFFIX_RE = re.compile(r"\s+-\s+(.*)$")
+_FEAT_RE = re.compile(r"^(feat|ft|featuring)\b")
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def _is_version_info(text):
+    text = text.strip()
+    words = set(text.split())
+    return bool(words.intersection(_VERSION_WORDS)) or bool(_FEAT_RE.match(text))
+
+
+def _strip_version_info(text):
+    text = _BRACKETED_RE.sub(lambda m: " " if _is_version_info(m.group(1)) else m.group(0), text)
+    match = _DASH_SUFFIX_RE.search(text)
+    if match and _is_version_info(match.group(1)):
+        text = text[:match.start()]
+    return text
+
+
+@lru_cache(maxsize=65536)
+def normalize(text):
+    """Return the comparison key of a name.
+
+    Accents, case, punctuation, and featured artists or version information
+    in brackets or after a dash, such as "(feat. X)", "(Remastered 2011)"
+    or "- Live", are removed. Names with nothing left are compared in
+    lower case instead, so they don't all share the empty key.
+    """
+    original = text
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold().replace("&", " and ")
+    text = _strip_version_info(text)
+    text = _NON_WORD_RE.sub(" ", text)
+    return _SPACES_RE.sub(" ", text).strip() or original.lower()
+
+
+@lru_cache(maxsize=65536)
+def trigrams(key):
+    padded = "  {} ".format(key)
+    return frozenset(padded[idx:idx + 3] for idx in range(len(padded) - 2))
+
+
+class ExactMatcher:
+    """Case-insensitive string equality."""
+
+    name = "exact"
+
+    def __init__(self, threshold=1.0):
+        self.threshold = threshold
+
+    def key(self, text):
+        return text.lower()
+
+    def similarity(self, query_key, candidate_key):
+        return 1.0 if query_key == candidate_key else 0.0
+
+    def score(self, query, candidate):
+        """Score a candidate against query, both tuples of names.
+
+        Fields of the candidate can be tuples of alternatives (such as the
+        artists of a track), the best of them is used. The result is the
+        average of the field scores.
+        """
+        total = 0.0
+        for query_value, candidate_value in zip(query, candidate):
+            if not isinstance(candidate_value, tuple):
+                candidate_value = (candidate_value,)
+            query_key = self.key(query_value)
+            total += max(self.similarity(query_key, self.key(value)) for value in candidate_value)
+        return total / len(query)
+
+    @staticmethod
+    def is_literal(query, candidate):
+        """Whether every field of candidate is the query value, ignoring case only."""
+        for query_value, candidate_value in zip(query, candidate):
+            if not isinstance(candidate_value, tuple):
+                candidate_value = (candidate_value,)
+            if query_value.lower() not in [value.lower() for value in candidate_value]:
+                return False
+        return True
+
+    def best(self, query, candidates):
+        """Return the index of the best scoring candidate, None if none reach the threshold.
+
+        Among the candidates with a perfect score, one equal to the query up
+        to case wins over one equal only once normalized ("Song" over "Song
+        - Live").
+        """
+        best_idx = None
+        best_score = self.threshold
+        for idx, candidate in enumerate(candidates):
+            score = self.score(query, candidate)
+            if score >= best_score:
+                if score == 1.0 and self.is_literal(query, candidate):
+                    return idx
+                if best_idx is None or score > best_score:
+                    best_idx = idx
+                    best_score = score
+        return best_idx
+
+    def index(self, items):
+        return MatchIndex(self, items)
+
+
+class NormalizedMatcher(ExactMatcher):
+    """Equality of the normalized names."""
+
+    name = "normalized"
+
+    def key(self, text):
+        return normalize(text)
+
+
+class FuzzyMatcher(NormalizedMatcher):
+    """Trigram similarity (Dice coefficient) of the normalized names."""
+
+    name = "fuzzy"
+
+    def __init__(self, threshold=0.8):
+        super().__init__(threshold)
+
+    def similarity(self, query_key, candidate_key):
+        if query_key == candidate_key:
+            return 1.0
+        query_trigrams = trigrams(query_key)
+        candidate_trigrams = trigrams(candidate_key)
+        return 2.0 * len(query_trigrams & candidate_trigrams) / (len(query_trigrams) + len(candidate_trigrams))
+
+
+class MatchIndex:
+    """Precomputed index of (value, name) items to look names up in.
+
+    Names are found by their key first, preferring the item whose name is
+    the same up to case when several share the key. For matchers with a
+    similarity other than equality, the remaining lookups are scored against the
+    candidates sharing at least one trigram, found through an inverted
+    trigram index.
+    """
+
+    def __init__(self, matcher, items):
+        self.matcher = matcher
+        self._keys = {}
+        self._items = []
+        self._trigram_index = None
+        for value, name in items:
+            key = matcher.key(name)
+            self._keys.setdefault(key, []).append((name.lower(), value))
+            self._items.append((key, value))
+
+    def _build_trigram_index(self):
+        self._trigram_index = {}
+        for idx, (key, _) in enumerate(self._items):
+            for trigram in trigrams(key):
+                self._trigram_index.setdefault(trigram, []).append(idx)
+
+    def find(self, name):
+        key = self.matcher.key(name)
+        if key in self._keys:
+            candidates = self._keys[key]
+            lowered = name.lower()
+            for candidate_name, value in candidates:
+                if candidate_name == lowered:
+                    return value
+            return candidates[0][1]
+        if isinstance(self.matcher, FuzzyMatcher):
+            return self._find_fuzzy(key)
+        return None
+
+    def _find_fuzzy(self, key):
+        if self._trigram_index is None:
+            self._build_trigram_index()
+
+        query_trigrams = trigrams(key)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigram_index.get(trigram, ()))
+
+        best_value = None
+        best_score = self.matcher.threshold
+        for idx, count in shared.items():
+            candidate_key, value = self._items[idx]
+            score = 2.0 * count / (len(query_trigrams) + len(trigrams(candidate_key)))
+            if score >= best_score:
+                best_value = value
+                best_score = score
+        return best_value
+
+
+MATCHERS = {matcher.name: matcher for matcher in (ExactMatcher, NormalizedMatcher, FuzzyMatcher)}
+
+
+def get_matcher(name, threshold=None):
+    try:
+        matcher_cls = MATCHERS[name]
+    except KeyError:
+        raise ValueError("Unknown matcher: {}".format(name))
+    if threshold is None:
+        return matcher_cls()
+    return matcher_cls(threshold)
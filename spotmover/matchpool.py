@@ -0,0 +1,34 @@
+from concurrent.futures import ProcessPoolExecutor
+
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    global _worker_matcher  # pylint: disable=W0603
+    _worker_matcher = matcher
+
+
+def _best(query, candidates):
+    return _worker_matcher.best(query, candidates)
+
+
+class MatchPool:
+    """Matcher running candidate scoring in a pool of processes.
+
+    The lookup workers submit the candidates of a search result and wait
+    for the chosen index, so CPU heavy matching does not compete with them
+    for the GIL. Everything else is delegated to the wrapped matcher.
+    """
+
+    def __init__(self, matcher, processes):
+        self.matcher = matcher
+        self._executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(matcher,))
+
+    def __getattr__(self, name):
+        return getattr(self.matcher, name)
+
+    def best(self, query, candidates):
+        return self._executor.submit(_best, query, candidates).result()
+
+    def close(self):
+        self._executor.shutdown()
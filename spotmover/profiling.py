@@ -0,0 +1,188 @@
+import time
+import asyncio
+import threading
+import functools
+from contextlib import contextmanager
+
+from spotmover.cache import Cache
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _bucket_label(bound):
+    if bound < 1.0:
+        return "<={}ms".format(int(bound * 1000))
+    return "<={}s".format(bound)
+
+
+class OperationStats:
+    __slots__ = ("count", "errors", "total", "max", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def add(self, duration, error):
+        self.count += 1
+        self.errors += int(error)
+        self.total += duration
+        self.max = max(self.max, duration)
+        for idx, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                self.histogram[idx] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def to_dict(self):
+        histogram = {_bucket_label(bound): count for bound, count in zip(BUCKETS, self.histogram)}
+        histogram[">{}s".format(BUCKETS[-1])] = self.histogram[-1]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "histogram": histogram,
+        }
+
+
+class Profiler:
+    """Counts and times named operations, such as API calls and cache accesses.
+
+    Operations are recorded with ``timer()`` or by wrapping callables with
+    ``wrap()``. ``report()`` returns the collected statistics together with
+    the ones of the cache and rate limiter given with ``add_source()``.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._operations = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, duration, error=False):
+        with self._lock:
+            if name not in self._operations:
+                self._operations[name] = OperationStats()
+            self._operations[name].add(duration, error)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.monotonic()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.record(name, time.monotonic() - start, error)
+
+    def wrap(self, name, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def add_source(self, name, stats_func):
+        """Include the result of stats_func() in the report under name."""
+        self._sources[name] = stats_func
+
+    def report(self):
+        with self._lock:
+            operations = {name: stats.to_dict() for name, stats in sorted(self._operations.items())}
+        retval = {
+            "wall_time": time.monotonic() - self.started,
+            "operations": operations,
+        }
+        for name, stats_func in self._sources.items():
+            retval[name] = stats_func()
+
+        cache_stats = retval.get("cache")
+        if cache_stats and "hits" in cache_stats:
+            lookups = cache_stats["hits"] + cache_stats["misses"]
+            cache_stats["hit_ratio"] = cache_stats["hits"] / lookups if lookups else 0.0
+        return retval
+
+
+class ProfiledClient:
+    """Proxy which records every public method call of api as "<prefix>.<method>"."""
+
+    def __init__(self, api, profiler, prefix="api"):
+        self.api = api
+        self.profiler = profiler
+        self.prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self.api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        return self.profiler.wrap("{}.{}".format(self.prefix, name), attr)
+
+
+class ProfiledCache(Cache):
+    """Cache which records the time spent in the methods of another one."""
+
+    def __init__(self, cache, profiler):
+        self.cache = cache
+        self.profiler = profiler
+
+    def _timed(self, name, *args):
+        with self.profiler.timer("cache." + name):
+            return getattr(self.cache, name)(*args)
+
+    def haskey(self, key):
+        return self._timed("haskey", key)
+
+    def get(self, key, default=None):
+        return self._timed("get", key, default)
+
+    def set(self, key, value):
+        return self._timed("set", key, value)
+
+    def remove(self, key):
+        return self._timed("remove", key)
+
+    def keys(self):
+        return self.cache.keys()
+
+    def has_item(self, namespace, subkey):
+        return self._timed("has_item", namespace, subkey)
+
+    def get_item(self, namespace, subkey, default=None):
+        return self._timed("get_item", namespace, subkey, default)
+
+    def set_item(self, namespace, subkey, value):
+        return self._timed("set_item", namespace, subkey, value)
+
+    def remove_item(self, namespace, subkey):
+        return self._timed("remove_item", namespace, subkey)
+
+    def iter_items(self, namespace):
+        return self.cache.iter_items(namespace)
+
+    def set_many(self, mapping):
+        return self._timed("set_many", mapping)
+
+    def set_items(self, namespace, items):
+        return self._timed("set_items", namespace, items)
+
+    def flush(self):
+        return self._timed("flush")
+
+    def clear(self):
+        return self.cache.clear()
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
@@ -16,9 +16,36 @@ class Provider(ABC):
     def authenticate(self, *args, **kwargs) -> bool:
         pass
 
-    def dump(self):
+    def iter_songs(self):
+        raise NotImplementedError()
+
+    def iter_playlists(self):
+        """Yield the playlists as dicts with at least a "name"."""
+        raise NotImplementedError()
+
+    def iter_playlist_tracks(self, playlist):
+        """Yield the tracks of a playlist returned by iter_playlists()."""
         raise NotImplementedError()
 
+    def stream(self):
+        """Return the dump with iterators instead of lists.
+
+        The tracks of a playlist are fetched when they are iterated, they
+        must be consumed before moving to the next playlist.
+        """
+        playlists = (
+            {"name": playlist["name"], "tracks": self.iter_playlist_tracks(playlist)}
+            for playlist in self.iter_playlists()
+        )
+        return {"songs": self.iter_songs(), "playlists": playlists}
+
+    def dump(self):
+        data = self.stream()
+        return {
+            "songs": list(data["songs"]),
+            "playlists": [{"name": x["name"], "tracks": list(x["tracks"])} for x in data["playlists"]],
+        }
+
     def load_songs(self, data: Dump):
         raise NotImplementedError()
 
@@ -2,23 +2,34 @@
 import logging
 
 from gmusicapi import Mobileclient
-from spotmover.cache import DiskCache
+from spotmover.cache import NullCache, TieredCache
+from spotmover.caches import GOOGLE_CACHE
+from spotmover.profiling import ProfiledClient, ProfiledCache
 from .base import Provider, ProviderAuthError
-from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
 
 class GoogleProvider(Provider):
-    def __init__(self):
+    def __init__(self, cache_dir=None, profiler=None):
+        self.cache_dir = cache_dir
         self._setup_logging()
-        self.api = Mobileclient(debug_logging=self._is_debug_logging())
+        self.api = self.init_api()
         self._authenticated = False
         self._cache = self.init_cache()
         self._lazy_credentials = None
+        if profiler is not None:
+            self.api = ProfiledClient(self.api, profiler)
+            if hasattr(self._cache, "stats"):
+                profiler.add_source("cache", self._cache.stats)
+            self._cache = ProfiledCache(self._cache, profiler)
+
+    def init_api(self):
+        return Mobileclient(debug_logging=self._is_debug_logging())
 
     def init_cache(self):
-        return {}
+        # the library is read once per run, without the disk cache there is nothing to keep
+        return NullCache()
 
     def _is_debug_logging(self):
         loglevel = logger.getEffectiveLevel()
@@ -58,85 +69,84 @@ class GoogleProvider(Provider):
         if not self.is_authenticated():
             raise ProviderAuthError("Google provider is not authenticated")
 
-    def get_all_songs(self):
-        if "songs" in self._cache:
+    @staticmethod
+    def _make_track(track):
+        return {
+            "artist": track["albumArtist"],
+            "album": track["album"],
+            "title": track["title"],
+        }
+
+    def iter_songs(self):
+        pages = self._cache.get("song_pages")
+        if pages is not None:
             logger.info("Using cache for songs")
-            return self._cache["songs"]
+            for page_idx, songs in self._cache.iter_items("songs"):
+                if page_idx < pages:
+                    yield from songs
+            return
 
         self.need_authenticated()
         logger.info("Fetching songs")
-        songs = self.api.get_all_songs()
-        retval = []
-
-##        track_counts = defaultdict(int)
-##        total_tracks = {}
-#        import pdb
-#        pdb.set_trace()
-        for song in songs:
-            ##            album_key = (song["albumArtist"], song["album"], song["discNumber"])
-            ##            track_counts[album_key] += 1
-            ##            total_tracks[album_key] = song["totalTrackCount"]
-
-            retval.append({
-                "artist": song["albumArtist"],
-                "album": song["album"],
-                "title": song["title"],
-            })
-
-# for album_key in total_tracks:
-# if track_counts[album_key] == total_tracks[album_key]:
-##                print("Full album", album_key)
-
-        self._cache["songs"] = retval
-        logger.info("Number of songs: {}".format(len(retval)))
-        return retval
-
-    def get_all_playlists(self):
-        if "playlists" in self._cache:
+        pages = 0
+        count = 0
+        for page in self.api.get_all_songs(incremental=True):
+            songs = [self._make_track(song) for song in page]
+            # pages are cached as they arrive, the count marks the list complete
+            self._cache.set_items("songs", [(pages, songs)])
+            pages += 1
+            count += len(songs)
+            yield from songs
+
+        self._cache["song_pages"] = pages
+        self._cache.flush()
+        logger.info("Number of songs: {}".format(count))
+
+    def iter_playlists(self):
+        count = self._cache.get("playlist_count")
+        if count is not None:
             logger.info("Using cache for playlists")
-            return self._cache["playlists"]
+            for idx, playlist in self._cache.iter_items("playlists"):
+                if idx < count:
+                    yield playlist
+            return
 
         self.need_authenticated()
         logger.info("Fetching playlists")
         playlists = self.api.get_all_user_playlist_contents()
 
-        retval = []
+        count = 0
         for playlist in playlists:
             if playlist["deleted"]:
                 continue
 
-            name = playlist["name"]
-            tracks = []
-            for playlist_track in playlist["tracks"]:
-                if playlist_track["source"] == "2":
-                    track = playlist_track["track"]
-                    track_data = {
-                        "artist": track["albumArtist"],
-                        "album": track["album"],
-                        "title": track["title"],
-                    }
-                    tracks.append(track_data)
-
-            retval.append({
-                "name": name,
-                "tracks": tracks,
-            })
-
-        self._cache["playlists"] = retval
-
-        for item in retval:
+            item = {
+                "name": playlist["name"],
+                "tracks": [
+                    self._make_track(playlist_track["track"])
+                    for playlist_track in playlist["tracks"] if playlist_track["source"] == "2"
+                ],
+            }
+            self._cache.set_items("playlists", [(count, item)])
+            count += 1
             logger.info("Playlist: {}".format(item["name"]))
-        return retval
+            yield item
 
-    def dump(self):
-        retval = {
-            "songs": self.get_all_songs(),
-            "playlists": self.get_all_playlists(),
+        self._cache["playlist_count"] = count
+        self._cache.flush()
 
-        }
-        return retval
+    def iter_playlist_tracks(self, playlist):
+        return iter(playlist["tracks"])
+
+    def get_all_songs(self):
+        return list(self.iter_songs())
+
+    def get_all_playlists(self):
+        return list(self.iter_playlists())
 
 
 class CachedGoogleProvider(GoogleProvider):
+    cache_spec = GOOGLE_CACHE
+
     def init_cache(self):
-        return DiskCache("spotmover-google")
+        return TieredCache(self.cache_spec.open(self.cache_dir))
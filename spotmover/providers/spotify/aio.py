@@ -0,0 +1,422 @@
+import asyncio
+import logging
+
+import aiohttp
+import spotipy
+from spotmover.providers.spotify.spotify import (
+    API_PREFIX, SpotifyProvider, NotFoundError, album_query, classify_error, diff_playlist, found_album_ids,
+    page_urls, song_query
+)
+from spotmover.ratelimit import RETRY, UNSENT
+from spotmover.cache import TieredCache, NoDefault
+from spotmover.caches import SPOTIFY_CACHE
+from spotmover.dump import Dump
+from spotmover.matchpool import MatchPool
+
+logger = logging.getLogger(__name__)
+
+
+def classify_async_error(err):
+    if isinstance(err, aiohttp.ClientConnectorError):
+        return (UNSENT, None)
+    if isinstance(err, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return (RETRY, None)
+    return classify_error(err)
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class AsyncSpotifyClient:
+    """Minimal asyncio client for the Spotify Web API endpoints used by spotmover.
+
+    Requests go through the rate limiter and at most ``concurrency`` of them
+    are in flight at the same time. With a ``profiler``, every attempt of a
+    request is recorded as "api.<name>". Errors are raised as
+    ``spotipy.SpotifyException`` so they are handled the same way as the ones
+    of the synchronous client.
+    """
+
+    def __init__(self, session, limiter, concurrency, prefix=API_PREFIX, profiler=None):
+        self.session = session
+        self.limiter = limiter
+        self.prefix = prefix
+        self.profiler = profiler
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _request(self, method, url, params=None, payload=None):
+        if not url.startswith("http"):
+            url = self.prefix + url
+        async with self.session.request(method, url, params=params, json=payload) as response:
+            if response.status >= 400:
+                raise spotipy.SpotifyException(
+                    response.status,
+                    -1,
+                    "{}:\n {}".format(response.url, await response.text()),
+                    headers=response.headers,
+                )
+            if response.content_length == 0:
+                return None
+            return await response.json(content_type=None)
+
+    async def request(self, method, url, params=None, payload=None, name="request"):
+        send = self._request
+        if self.profiler is not None:
+            send = self.profiler.wrap("api." + name, send)
+        # the slot is taken before the rate limiter is asked for a turn, so only the requests about to be
+        # sent have reserved one and a throttled response slows down all the others
+        async with self._semaphore:
+            # a POST may have been applied before an error, it is only sent again when throttled or unsent
+            return await self.limiter.call_async(send, method, url, params, payload, idempotent=method != "POST")
+
+    async def search(self, q, type="track", limit=10):  # pylint: disable=W0622
+        return await self.request("GET", "search", params={"q": q, "type": type, "limit": limit}, name="search")
+
+    async def albums(self, albums):
+        return await self.request("GET", "albums", params={"ids": ",".join(albums)}, name="albums")
+
+    async def next(self, results):
+        if results["next"]:
+            return await self.request("GET", results["next"], name="next")
+        return None
+
+    async def current_user_saved_albums(self, limit=50):
+        return await self.request("GET", "me/albums", params={"limit": limit}, name="current_user_saved_albums")
+
+    async def current_user_saved_albums_add(self, albums):
+        return await self.request("PUT", "me/albums", params={"ids": ",".join(albums)},
+                                  name="current_user_saved_albums_add")
+
+    async def current_user_playlists(self, limit=50):
+        return await self.request("GET", "me/playlists", params={"limit": limit}, name="current_user_playlists")
+
+    async def user_playlist_create(self, user, name, public=False):
+        return await self.request("POST", "users/{}/playlists".format(user), payload={"name": name, "public": public},
+                                  name="user_playlist_create")
+
+    async def user_playlist_add_tracks(self, user, playlist_id, tracks):  # pylint: disable=W0613
+        uris = ["spotify:track:{}".format(track_id) for track_id in tracks]
+        return await self.request("POST", "playlists/{}/tracks".format(playlist_id), payload={"uris": uris},
+                                  name="user_playlist_add_tracks")
+
+    async def playlist_items(self, playlist_id, fields=None, limit=100):
+        params = {"limit": limit, "additional_types": "track"}
+        if fields:
+            params["fields"] = fields
+        return await self.request("GET", "playlists/{}/tracks".format(playlist_id), params=params,
+                                  name="playlist_items")
+
+    async def playlist_remove_all_occurrences_of_items(self, playlist_id, items):
+        payload = {"tracks": [{"uri": "spotify:track:{}".format(track_id)} for track_id in items]}
+        return await self.request("DELETE", "playlists/{}/tracks".format(playlist_id), payload=payload,
+                                  name="playlist_remove_all_occurrences_of_items")
+
+
+class AsyncSpotifyProvider(SpotifyProvider):
+    """Spotify provider running lookups and writes on an asyncio HTTP client.
+
+    ``jobs`` is the maximum number of requests in flight, so it can be set
+    much higher than for the thread based provider.
+    """
+
+    def __init__(self, jobs=100, rate=10.0, journal=None, album_first=True, matcher=None, cache_dir=None,
+                 profiler=None):
+        super().__init__(jobs=jobs, rate=rate, journal=journal, album_first=album_first, matcher=matcher,
+                         cache_dir=cache_dir, profiler=profiler)
+        self.limiter.classify = classify_async_error
+
+    def connect(self, token, username):
+        # the client is created for the session of each _run
+        self.token = token
+        self.username = username
+
+    def is_authenticated(self):
+        return self.token is not None
+
+    def _run(self, coro_func, *args):
+        self.need_authentication()
+
+        async def runner():
+            headers = {"Authorization": "Bearer {}".format(self.token)}
+            async with aiohttp.ClientSession(headers=headers) as session:
+                self.api = AsyncSpotifyClient(session, self.limiter, self.jobs, self.api_prefix, self.profiler)
+                try:
+                    return await coro_func(*args)
+                finally:
+                    self.api = None
+
+        return asyncio.run(runner())
+
+    async def fetch_all_async(self, results, items_key="items"):
+        retval = list(results[items_key])
+
+        urls = page_urls(results)
+        if urls is not None:
+            pages = await asyncio.gather(*(self.api.request("GET", url, name="next") for url in urls))
+            for page in pages:
+                retval.extend(page[items_key])
+            return retval
+
+        while results["next"]:
+            results = await self.api.next(results)
+            retval.extend(results[items_key])
+        return retval
+
+    async def _select_async(self, select, cache_key, result):
+        # a MatchPool blocks until its worker process answers, keep the event loop running meanwhile
+        if isinstance(self.matcher, MatchPool):
+            return await asyncio.get_running_loop().run_in_executor(None, select, cache_key, result)
+        return select(cache_key, result)
+
+    async def get_album_async(self, artist, album):
+        cache_key = (artist, album)
+        cache_value = self._get_cached("albums", cache_key)
+        if not isinstance(cache_value, NoDefault):
+            return cache_value
+
+        result = await self.api.search(album_query(artist, album), type="album")
+        return await self._select_async(self._select_album, cache_key, result)
+
+    async def find_song_async(self, artist, album, song):
+        cache_key = (artist, album, song)
+        cache_value = self._get_cached("find_song", cache_key)
+        if not isinstance(cache_value, NoDefault):
+            return cache_value
+
+        result = await self.api.search(song_query(artist, album, song), type="track")
+        return await self._select_async(self._select_song, cache_key, result)
+
+    async def _resolve_album_async(self, src_album_artist):
+        try:
+            return (src_album_artist, await self.get_album_async(*src_album_artist))
+        except NotFoundError as err:
+            return (src_album_artist, err)
+
+    async def _resolve_song_async(self, song_key):
+        try:
+            return (song_key, await self.find_song_async(*song_key))
+        except NotFoundError as err:
+            return (song_key, err)
+
+    async def get_album_tracks_async(self, album_ids):
+        retval, chunks = self.cached_album_tracks(album_ids)
+
+        async def fetch(chunk):
+            for album in (await self.api.albums(chunk))["albums"]:
+                if album is None:
+                    continue
+                items = album["tracks"]["items"]
+                if album["tracks"]["next"]:
+                    items = await self.fetch_all_async(album["tracks"])
+                retval[album["id"]] = self.store_album_tracks(album["id"], items)
+
+        await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        return retval
+
+    async def resolve_songs_by_album_async(self, song_keys):
+        by_album = self.select_album_first(song_keys)
+        if not by_album:
+            return {}
+
+        albums = dict(await asyncio.gather(*(self._resolve_album_async(key) for key in by_album)))
+        tracklists = await self.get_album_tracks_async(found_album_ids(albums))
+        return self.match_tracklists(by_album, albums, tracklists)
+
+    async def resolve_songs_async(self, songs):
+        song_keys = self.unique_song_keys(songs)
+        resolved = {}
+        if self.album_first:
+            resolved.update(await self.resolve_songs_by_album_async(self.uncached_song_keys(song_keys)))
+
+        leftovers = [key for key in song_keys if key not in resolved]
+        resolved.update(await asyncio.gather(*(self._resolve_song_async(key) for key in leftovers)))
+        return resolved
+
+    async def _load_songs(self, data: Dump):
+        if self.journal.songs_done:
+            logger.info("Albums are already saved according to the journal, skipping")
+            return
+
+        current_albums = self.journal.current_albums
+        if current_albums is None:
+            saved_items = await self.fetch_all_async(await self.api.current_user_saved_albums())
+            current_albums = [
+                (artist["name"], album["album"]["name"]) for album in saved_items for artist in album["album"]["artists"]
+            ]
+            self.journal.record("current_albums", albums=current_albums)
+
+        pending = self.filter_saved_albums(data.albums, current_albums)
+        tasks = [asyncio.ensure_future(self._resolve_album_async(key)) for key in pending]
+
+        async def save(batch):
+            await self.api.current_user_saved_albums_add(albums=batch)
+            self.journal.record("albums_saved", ids=batch)
+
+        # full batches are saved while the remaining lookups are running
+        writes = []
+        batch = []
+        found = 0
+        not_found = []
+        for task in tasks:
+            album_id = self.report_album(*await task, not_found)
+            if album_id is None:
+                continue
+            found += 1
+            if album_id not in self.journal.saved_album_ids:
+                batch.append(album_id)
+            if len(batch) == 50:
+                writes.append(asyncio.ensure_future(save(batch)))
+                batch = []
+        if batch:
+            writes.append(asyncio.ensure_future(save(batch)))
+        self.report_not_found_albums(found, not_found)
+
+        await asyncio.gather(*writes)
+        self.journal.record("songs_done")
+        logger.info("Done.")
+
+    def load_songs(self, data: Dump):
+        self._run(self._load_songs, data)
+
+    async def _create_playlist(self, name, track_ids):
+        """Create playlist name with the tracks of the async iterator track_ids.
+
+        Batches of 100 tracks are added one after the other, to keep their
+        order, while the iterator is still being consumed.
+        """
+        playlist_id = self.journal.get_playlist_id(name)
+        if playlist_id is not None:
+            logger.info("Resuming playlist '{}'".format(name))
+        added = self.journal.get_added_tracks(name)
+
+        count = 0
+        batch = []
+        async for track_id in track_ids:
+            if added[track_id] > 0:
+                added[track_id] -= 1
+                continue
+            batch.append(track_id)
+            count += 1
+            if len(batch) < 100:
+                continue
+
+            playlist_id = await self._add_tracks(name, playlist_id, batch)
+            batch = []
+
+        if batch:
+            playlist_id = await self._add_tracks(name, playlist_id, batch)
+
+        if playlist_id is None:
+            logger.error("No songs found for playlist '{}'".format(name))
+            return
+        logger.info("Added {} tracks to playlist '{}'".format(count, name))
+        self.journal.record("playlist_done", name=name)
+
+    async def _add_tracks(self, name, playlist_id, batch):
+        if playlist_id is None:
+            logger.info("Creating playlist '{}'".format(name))
+            playlist = await self.api.user_playlist_create(self.username, name, public=False)
+            playlist_id = playlist["id"]
+            self.journal.record("playlist_created", name=name, id=playlist_id)
+        await self.api.user_playlist_add_tracks(self.username, playlist_id, batch)
+        self.journal.record("tracks_added", name=name, ids=batch)
+        return playlist_id
+
+    async def _submit_songs(self, songs):
+        """Return a dict of futures of the lookups of songs, see SpotifyProvider.submit_songs."""
+        song_keys = self.unique_song_keys(songs)
+        resolved = {}
+        if self.album_first:
+            resolved = await self.resolve_songs_by_album_async(self.uncached_song_keys(song_keys))
+
+        futures = {}
+        for song_key in song_keys:
+            if song_key in resolved:
+                futures[song_key] = asyncio.get_running_loop().create_future()
+                futures[song_key].set_result((song_key, resolved[song_key]))
+            else:
+                futures[song_key] = asyncio.ensure_future(self._resolve_song_async(song_key))
+        return futures
+
+    async def _iter_track_ids(self, songs, futures):
+        for song in songs:
+            track_id = (await futures[(song["artist"], song["album"], song["title"])])[1]
+            if isinstance(track_id, NotFoundError):
+                logger.warning("Not found: {}/{}".format(song["artist"], song["title"]))
+                continue
+            yield track_id
+
+    async def _sync_playlist(self, name, playlist_id, track_ids, remove_extra):
+        results = await self.api.playlist_items(playlist_id, fields="items(track(id)),next,total,limit,offset")
+        items = await self.fetch_all_async(results)
+        current_ids = [item["track"]["id"] for item in items if item["track"] and item["track"]["id"]]
+        missing, extra = diff_playlist(current_ids, track_ids)
+        logger.info("Syncing playlist '{}': {} tracks to add, {} not in the dump".format(name, len(missing), len(extra)))
+
+        for start_idx in range(0, len(missing), 100):
+            await self.api.user_playlist_add_tracks(self.username, playlist_id, missing[start_idx:start_idx + 100])
+
+        if remove_extra:
+            extra = sorted(extra)
+            await asyncio.gather(*(
+                self.api.playlist_remove_all_occurrences_of_items(playlist_id, extra[start_idx:start_idx + 100])
+                for start_idx in range(0, len(extra), 100)
+            ))
+        self.journal.record("playlist_done", name=name)
+
+    async def _load_playlists(self, data: Dump, force: bool, force_create: bool, sync, remove_extra):
+        current_playlists = self.journal.current_playlists
+        if current_playlists is None:
+            playlists = await self.fetch_all_async(await self.api.current_user_playlists())
+            self.journal.record("current_playlists", playlists=[{"name": x["name"], "id": x["id"]} for x in playlists])
+        current_playlists = {x["name"]: x["id"] for x in self.journal.current_playlists}
+        selected = self.select_playlists(data.playlists, current_playlists, force_create, sync, force)
+
+        songs = (song for playlist in selected for song in playlist["tracks"])
+        if force:
+            futures = await self._submit_songs(songs)
+        else:
+            # every song has to be resolved before asking about the incomplete playlists
+            resolved = await self.resolve_songs_async(songs)
+            self._cache.flush()
+
+        for playlist in selected:
+            if force:
+                track_ids = self._iter_track_ids(playlist["tracks"], futures)
+            else:
+                track_ids = self.prepare_playlist(playlist, force, resolved)
+                if track_ids is None:
+                    continue
+                track_ids = _aiter(track_ids)
+
+            if sync and playlist["name"] in current_playlists:
+                track_ids = [track_id async for track_id in track_ids]
+                await self._sync_playlist(playlist["name"], current_playlists[playlist["name"]], track_ids, remove_extra)
+            else:
+                await self._create_playlist(playlist["name"], track_ids)
+        self._cache.flush()
+
+    def load_playlists(self, data: Dump, force: bool, force_create: bool, sync=False, remove_extra=False):
+        self._run(self._load_playlists, data, force, force_create, sync, remove_extra)
+
+    async def _warm_cache(self, data: Dump):
+        albums = list(data.group_songs_by_albums(data.songs))
+        logger.info("Resolving {} albums".format(len(albums)))
+        results = await asyncio.gather(*(self._resolve_album_async(key) for key in albums))
+        found = sum(1 for _, album in results if not isinstance(album, NotFoundError))
+        logger.info("Found {} of {} albums".format(found, len(albums)))
+
+        resolved = await self.resolve_songs_async(song for playlist in data.playlists for song in playlist["tracks"])
+        self._log_warmed_songs(resolved)
+
+    def warm_cache(self, data: Dump):
+        self._run(self._warm_cache, data)
+
+
+class CachedAsyncSpotifyProvider(AsyncSpotifyProvider):
+    cache_spec = SPOTIFY_CACHE
+
+    def init_cache(self):
+        return TieredCache(self.cache_spec.open(self.cache_dir))
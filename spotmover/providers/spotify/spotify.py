@@ -1,13 +1,31 @@
 import logging
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 
+import requests
 import spotipy
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
 from spotmover.providers.spotify.util import obtain_token_localhost
 from spotmover.providers.base import Provider, ProviderAuthError
 from spotmover.dump import Dump
-from spotmover.cache import DiskCache
+from spotmover.concurrency import parallel_map, BatchWriter
+from spotmover.journal import Journal
+from spotmover.matching import NormalizedMatcher
+from spotmover.ratelimit import RateLimiter, RateLimitedClient, THROTTLED, RETRY, UNSENT
+from spotmover.profiling import ProfiledClient, ProfiledCache
+from spotmover.cache import MemoryCache, TieredCache, NoDefault
+from spotmover.caches import SPOTIFY_CACHE
 
 logger = logging.getLogger(__name__)
 
+API_PREFIX = "https://api.spotify.com/v1/"
+
+# methods sending POST requests, which are not retried once they may have reached the server
+POST_METHODS = ("user_playlist_create", "user_playlist_add_tracks")
+
+PLAYLIST_TRACK_FIELDS = "items(track(name,artists(name),album(name,artists(name)))),next,total,limit,offset"
+
 
 def confirm(msg):
     answer = input(msg + " ")
@@ -18,23 +36,160 @@ class NotFoundError(Exception):
     pass
 
 
+def classify_error(err):
+    if isinstance(err, spotipy.SpotifyException):
+        if err.http_status == 429:
+            try:
+                retry_after = float(err.headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                retry_after = None
+            return (THROTTLED, retry_after)
+        if err.http_status >= 500:
+            return (RETRY, None)
+    elif isinstance(err, requests.ConnectTimeout):
+        return (UNSENT, None)
+    elif isinstance(err, (requests.ConnectionError, requests.Timeout)):
+        # refused or unresolved connections are wrapped in a MaxRetryError
+        reason = getattr(err.args[0], "reason", None) if err.args else None
+        if isinstance(reason, (NewConnectionError, ConnectTimeoutError)):
+            return (UNSENT, None)
+        return (RETRY, None)
+    return None
+
+
+def diff_playlist(current_ids, track_ids):
+    """Compare the current content of a playlist with the wanted one.
+
+    Returns the tracks to add (in the order of track_ids, duplicates
+    included as many times as they are missing) and the set of tracks which
+    are in the playlist but not in track_ids.
+    """
+    available = Counter(current_ids)
+    missing = []
+    for track_id in track_ids:
+        if available[track_id] > 0:
+            available[track_id] -= 1
+        else:
+            missing.append(track_id)
+
+    extra = set(current_ids).difference(track_ids)
+    return (missing, extra)
+
+
+def page_urls(results):
+    """Return the URLs of the pages following results, None if they can't be computed.
+
+    Offset based paging objects carry total, limit and offset, so the URLs
+    of every remaining page can be built from the URL of the next one.
+    """
+    total = results.get("total")
+    limit = results.get("limit")
+    offset = results.get("offset")
+    if not results["next"] or total is None or not limit or offset is None:
+        return None
+
+    url = urlparse(results["next"])
+    query = dict(parse_qsl(url.query))
+    if "offset" not in query:
+        return None
+
+    retval = []
+    for page_offset in range(offset + limit, total, limit):
+        query["offset"] = str(page_offset)
+        query["limit"] = str(limit)
+        retval.append(urlunparse(url._replace(query=urlencode(query))))
+    return retval
+
+
+def make_song(album, track):
+    """Return the dump record of a track, None if it has no artist (local files)."""
+    artists = album.get("artists") or track.get("artists")
+    if not artists or not track.get("name"):
+        return None
+    return {"artist": artists[0]["name"], "album": album.get("name") or "", "title": track["name"]}
+
+
+def album_query(artist, album):
+    return "artist:{} album:{}".format(artist, album)
+
+
+def song_query(artist, album, song):
+    return "artist:{} album:{} track:{}".format(artist, album, song)
+
+
+def found_album_ids(albums):
+    return [album["id"] for album in albums.values() if not isinstance(album, NotFoundError)]
+
+
+def group_song_keys_by_album(song_keys):
+    retval = {}
+    for song_key in song_keys:
+        retval.setdefault(song_key[:2], []).append(song_key)
+    return retval
+
+
+def match_album_tracks(song_keys, tracks, matcher):
+    """Match (artist, album, title) keys against the (id, name) tracklist of their album.
+
+    Returns a dict of the matched keys and their track ids.
+    """
+    index = matcher.index(tracks)
+
+    retval = {}
+    for song_key in song_keys:
+        track_id = index.find(song_key[2])
+        if track_id is not None:
+            retval[song_key] = track_id
+    return retval
+
+
 class SpotifyProvider(Provider):
-    def __init__(self):
+    # albums with fewer uncached tracks than this are not fetched unless the album is already cached
+    album_first_min_tracks = 2
+
+    def __init__(self, jobs=1, rate=10.0, journal=None, album_first=True, matcher=None, cache_dir=None,
+                 profiler=None):
+        self.jobs = jobs
+        self.cache_dir = cache_dir
+        self.profiler = profiler
+        self.album_first = album_first
+        self.matcher = matcher or NormalizedMatcher()
+        self.limiter = RateLimiter(classify_error, rate=rate)
+        self.journal = journal or Journal()
         self.token = None
         self.api = None
+        self.api_prefix = API_PREFIX
         self._cache = self.init_cache()
         self.username = None
+        if profiler is not None:
+            profiler.add_source("rate_limiter", self.limiter.stats)
+            if hasattr(self._cache, "stats"):
+                profiler.add_source("cache", self._cache.stats)
+            self._cache = ProfiledCache(self._cache, profiler)
 
     def init_cache(self):
-        return {}
+        return MemoryCache()
+
+    def _profiled(self, api):
+        if self.profiler is None:
+            return api
+        return ProfiledClient(api, self.profiler)
 
     def authenticate(self, username: str, client_id: str, client_secret: str, redirect_uri: str):  # pylint: disable=W0221
-        scope = 'user-library-modify playlist-modify-private playlist-modify-public playlist-read-private playlist-read-collaborative'
+        scope = 'user-library-read user-library-modify playlist-modify-private playlist-modify-public playlist-read-private playlist-read-collaborative'
         token = obtain_token_localhost(username, client_id, client_secret, redirect_uri, scope=scope)
         if not token:
             raise ProviderAuthError("Unable to authenticate user {}".format(username))
+        self.connect(token, username)
+
+    def connect(self, token, username):
+        """Use an access token obtained earlier, without the authorization flow."""
         self.token = token
-        self.api = spotipy.Spotify(auth=token)
+        # retries are handled by the rate limiter, the session passed here has no retry adapter mounted
+        api = spotipy.Spotify(auth=token, requests_session=requests.Session())
+        api.prefix = self.api_prefix
+        # profiled inside the limiter, so every attempt is timed on its own
+        self.api = RateLimitedClient(self._profiled(api), self.limiter, POST_METHODS)
         self.username = username
 
     def is_authenticated(self):
@@ -44,50 +199,66 @@ class SpotifyProvider(Provider):
         if not self.is_authenticated():
             raise ProviderAuthError("User is not authenticated")
 
-    def get_album(self, artist, album):
-        album_cache = self._cache.get("albums")
-        if album_cache is None:
-            self._cache["albums"] = {}
-            album_cache = self._cache.get("albums")
-
-        cache_key = (artist, album)
-        if cache_key in album_cache:
-            cache_value = album_cache[cache_key]
-            if isinstance(cache_value, Exception):
-                raise cache_value
-            else:
-                return album_cache[cache_key]
+    def _get_cached(self, namespace, cache_key):
+        nodefault = NoDefault()
+        cache_value = self._cache.get_item(namespace, cache_key, nodefault)
+        if isinstance(cache_value, Exception):
+            raise cache_value
+        return cache_value
 
-        self.need_authentication()
+    def select_album(self, items, album):
+        if len(items) == 0:
+            raise NotFoundError("No such album: {}".format(album))
+
+        idx = self.matcher.best((album,), [(item["name"],) for item in items])
+        if idx is None:
+            raise NotFoundError("No match for the album: {}".format(album))
+        return items[idx]
+
+    def _select_and_cache(self, namespace, cache_key, select, *args):
+        """Pick the result of a lookup with select and cache it, or the NotFoundError it raised.
+
+        Shared by the sync and async lookups, which only differ in how the
+        search results are fetched.
+        """
+        try:
+            retval = select(*args)
+        except NotFoundError as exc:
+            self._cache.set_item(namespace, cache_key, exc)
+            raise
+
+        self._cache.set_item(namespace, cache_key, retval)
+        return retval
 
-        result = self.api.search("artist:{} album:{}".format(artist, album), type="album")
+    def _select_album(self, cache_key, result):
+        return self._select_and_cache("albums", cache_key, self.select_album, result["albums"]["items"], cache_key[1])
 
-        album_l = album.lower()
+    def get_album(self, artist, album):
+        cache_key = (artist, album)
+        cache_value = self._get_cached("albums", cache_key)
+        if not isinstance(cache_value, NoDefault):
+            return cache_value
 
-        if len(result["albums"]["items"]) == 0:
-            exc = NotFoundError("No such album: {}".format(album))
-            album_cache[cache_key] = exc
-            self._cache["albums"] = album_cache
-            raise exc
+        self.need_authentication()
+        result = self.api.search(album_query(artist, album), type="album")
+        return self._select_album(cache_key, result)
 
-        retval = None
-        for album in result["albums"]["items"]:
-            if album["name"].lower() == album_l:
-                retval = album
-                break
+    def _fetch_page(self, url):
+        return self.api.next({"next": url})
 
-        if not retval:
-            exc = NotFoundError("No exact match for the album: {}".format(album))
-            album_cache[cache_key] = exc
-            self._cache["albums"] = album_cache
-            raise exc
+    def fetch_all(self, results, items_key="items"):
+        """Return the items of all pages, starting with the results of the first one.
 
-        album_cache[cache_key] = retval
-        self._cache["albums"] = album_cache
-        return retval
+        Offset based pages are fetched concurrently, others (cursor based)
+        are followed one after the other.
+        """
+        retval = list(results[items_key])
 
-    def fetch_all(self, results, items_key="items", limit=50):
-        retval = results[items_key]
+        urls = page_urls(results)
+        if urls is not None:
+            for page in parallel_map(self._fetch_page, urls, self.jobs):
+                retval.extend(page[items_key])
+            return retval
 
         while results["next"]:
             results = self.api.next(results)
@@ -96,7 +267,7 @@ class SpotifyProvider(Provider):
 
     def iter_current_user_saved_albums(self):
         self.need_authentication()
-        saved_items = self.fetch_all(self.api.current_user_saved_albums())
+        saved_items = self.fetch_all(self.api.current_user_saved_albums(limit=50))
 
         for album in saved_items:
             album_name = album["album"]["name"]
@@ -105,95 +276,278 @@ class SpotifyProvider(Provider):
 
                 yield (artist_name, album_name)
 
-    def load_songs(self, data: Dump):
-        self.need_authentication()
+    def _resolve_album(self, src_album_artist):
+        try:
+            return (src_album_artist, self.get_album(*src_album_artist))
+        except NotFoundError as err:
+            return (src_album_artist, err)
 
-        album_ids = []
-        not_found = []
-        current_albums = set([(x[0].lower(), x[1].lower()) for x in self.iter_current_user_saved_albums()])
+    def filter_saved_albums(self, albums, current_albums):
+        # compared up to case only: with the normalized key, a saved "X (Live)" would hide the album "X"
+        current_albums = set([(x[0].lower(), x[1].lower()) for x in current_albums])
 
-        for src_album in data.albums:
+        for src_album in albums:
             src_album_artist = (src_album["artist"], src_album["album"])
-            src_album_artist_lower = (src_album["artist"].lower(), src_album["album"].lower())
-            if src_album_artist_lower in current_albums:
+            if (src_album["artist"].lower(), src_album["album"].lower()) in current_albums:
                 logger.info("Already added; {}: {}".format(*src_album_artist))
                 continue
+            yield src_album_artist
 
-            try:
-                album = self.get_album(*src_album_artist)
-            except NotFoundError:
-                logger.warn("Not found; {}: {}".format(*src_album_artist))
-                not_found.append(src_album_artist)
-            else:
-                logger.info("Album found; {}: {}".format(*src_album_artist))
-                album_ids.append(album["id"])
+    def report_album(self, src_album_artist, album, not_found):
+        """Log the result of an album lookup, return the album id if it was found."""
+        if isinstance(album, NotFoundError):
+            logger.warn("Not found; {}: {}".format(*src_album_artist))
+            not_found.append(src_album_artist)
+            return None
 
+        logger.info("Album found; {}: {}".format(*src_album_artist))
+        return album["id"]
+
+    def report_not_found_albums(self, found, not_found):
         logger.info("Albums not found in spotify:")
         for album in not_found:
             logger.info("    {}: {}".format(*album))
 
-        logger.info("Found {} albums, saving...".format(len(album_ids)))
+        self._cache.flush()
+        logger.info("Found {} albums".format(found))
 
-        for start_idx in range(0, len(album_ids), 50):
-            self.api.current_user_saved_albums_add(albums=album_ids[start_idx: start_idx + 50])
-        logger.info("Done.")
+    def collect_album_ids(self, results):
+        """Yield the ids of the albums found in results, report the rest at the end."""
+        found = 0
+        not_found = []
+        for src_album_artist, album in results:
+            album_id = self.report_album(src_album_artist, album, not_found)
+            if album_id is not None:
+                found += 1
+                yield album_id
 
-    def find_song(self, artist, album, song):
-        if "find_song" not in self._cache:
-            cache_obj = self._cache["find_song"] = {}
-        else:
-            cache_obj = self._cache["find_song"]
+        self.report_not_found_albums(found, not_found)
 
-        cache_key = (artist, album, song)
-        if cache_key in cache_obj:
-            cache_value = cache_obj[cache_key]
-            if isinstance(cache_value, Exception):
-                raise cache_value
-            else:
-                return cache_value
+    def _save_album_batch(self, batch):
+        self.api.current_user_saved_albums_add(albums=batch)
+        self.journal.record("albums_saved", ids=batch)
+
+    def load_songs(self, data: Dump):
+        """Save the albums of data.
+
+        Albums are saved in batches of 50 as soon as a batch is resolved,
+        while the lookups of the next ones are still running.
+        """
+        self.need_authentication()
+        if self.journal.songs_done:
+            logger.info("Albums are already saved according to the journal, skipping")
+            return
+
+        current_albums = self.journal.current_albums
+        if current_albums is None:
+            current_albums = list(self.iter_current_user_saved_albums())
+            self.journal.record("current_albums", albums=current_albums)
+
+        pending = self.filter_saved_albums(data.albums, current_albums)
+        with BatchWriter(self._save_album_batch, 50) as writer:
+            for album_id in self.collect_album_ids(parallel_map(self._resolve_album, pending, self.jobs)):
+                if album_id not in self.journal.saved_album_ids:
+                    writer.add(album_id)
+        self.journal.record("songs_done")
+        logger.info("Done.")
 
-        result = self.api.search("artist:{} album:{} track:{}".format(artist, album, song), type="track")
-        items = result["tracks"]["items"]
+    def select_track(self, items, artist, album, song):
         if len(items) == 0:
             logger.warning("find_song {}/{} {}: NOT FOUND".format(artist, album, song))
-            exc = NotFoundError("Song not found: {}".format(song))
-            cache_obj[cache_key] = exc
-            self._cache["find_song"] = cache_obj
-            raise exc
+            raise NotFoundError("Song not found: {}".format(song))
 
         if len(items) == 1:
             logger.info("find_song {}/{} {}: FOUND".format(artist, album, song))
             return items[0]["id"]
 
-        for item in items:
-            item_album_name = item["album"]["name"]
-            item_track_name = item["name"]
-            for artist_result in item["artists"]:
-                item_artist_name = artist_result["name"]
-                if item_album_name.lower() == album.lower() and \
-                        item_artist_name.lower() == artist.lower() and \
-                        item_track_name.lower() == song.lower():
-                    logger.info("find_song {}/{} {}: FOUND".format(artist, album, song))
-                    cache_obj[cache_key] = item["id"]
-                    self._cache["find_song"] = cache_obj
-                    return item["id"]
+        candidates = [
+            (tuple(x["name"] for x in item["artists"]), item["album"]["name"], item["name"]) for item in items
+        ]
+        idx = self.matcher.best((artist, album, song), candidates)
+        if idx is not None:
+            logger.info("find_song {}/{} {}: FOUND".format(artist, album, song))
+            return items[idx]["id"]
 
         logger.warn("find_song {}/{} {}: NOT FOUND".format(artist, album, song))
-        exc = NotFoundError("No exact match for song: {}".format(song))
-        cache_obj[cache_key] = exc
-        self._cache["find_song"] = cache_obj
-        raise exc
+        raise NotFoundError("No match for song: {}".format(song))
+
+    def _select_song(self, cache_key, result):
+        return self._select_and_cache("find_song", cache_key, self.select_track, result["tracks"]["items"], *cache_key)
+
+    def find_song(self, artist, album, song):
+        cache_key = (artist, album, song)
+        cache_value = self._get_cached("find_song", cache_key)
+        if not isinstance(cache_value, NoDefault):
+            return cache_value
+
+        result = self.api.search(song_query(artist, album, song), type="track")
+        return self._select_song(cache_key, result)
+
+    def _resolve_song(self, song_key):
+        try:
+            return (song_key, self.find_song(*song_key))
+        except NotFoundError as err:
+            return (song_key, err)
+
+    def unique_song_keys(self, songs):
+        song_keys = list(dict.fromkeys((song["artist"], song["album"], song["title"]) for song in songs))
+        logger.info("Resolving {} distinct songs".format(len(song_keys)))
+        return song_keys
+
+    def uncached_song_keys(self, song_keys):
+        return [key for key in song_keys if not self._cache.has_item("find_song", key)]
+
+    def _fetch_albums(self, album_ids):
+        return self.api.albums(album_ids)["albums"]
+
+    def cached_album_tracks(self, album_ids):
+        """Return the cached tracklists of album_ids and the chunks of 20 ids to fetch the rest in."""
+        retval = {}
+        missing = []
+        for album_id in album_ids:
+            tracks = self._cache.get_item("album_tracks", album_id)
+            if tracks is None:
+                missing.append(album_id)
+            else:
+                retval[album_id] = tracks
+        return (retval, [missing[start_idx:start_idx + 20] for start_idx in range(0, len(missing), 20)])
+
+    def store_album_tracks(self, album_id, items):
+        tracks = [(item["id"], item["name"]) for item in items if item["id"]]
+        self._cache.set_item("album_tracks", album_id, tracks)
+        return tracks
+
+    def get_album_tracks(self, album_ids):
+        """Return the tracklists of album_ids as a dict of lists of (id, name) tuples.
+
+        Albums not in the cache are fetched with the several albums endpoint,
+        20 at a time.
+        """
+        retval, chunks = self.cached_album_tracks(album_ids)
+        for albums in parallel_map(self._fetch_albums, chunks, self.jobs):
+            for album in albums:
+                if album is None:
+                    continue
+                items = album["tracks"]["items"]
+                if album["tracks"]["next"]:
+                    items = self.fetch_all(album["tracks"])
+                retval[album["id"]] = self.store_album_tracks(album["id"], items)
+        return retval
+
+    def select_album_first(self, song_keys):
+        """Group song_keys by album, keeping the albums worth fetching the tracklist of."""
+        by_album = {}
+        for album_key, keys in group_song_keys_by_album(song_keys).items():
+            if len(keys) >= self.album_first_min_tracks or self._cache.has_item("albums", album_key):
+                by_album[album_key] = keys
+        return by_album
+
+    def resolve_songs_by_album(self, song_keys):
+        """Resolve song_keys by fetching the tracklists of their albums.
+
+        Returns the matched songs, the rest should be looked up one by one.
+        """
+        by_album = self.select_album_first(song_keys)
+        if not by_album:
+            return {}
+
+        albums = dict(parallel_map(self._resolve_album, list(by_album), self.jobs))
+        tracklists = self.get_album_tracks(found_album_ids(albums))
+        return self.match_tracklists(by_album, albums, tracklists)
+
+    def match_tracklists(self, by_album, albums, tracklists):
+        """Match the song keys grouped by album against the tracklists of the albums found, cache the matches."""
+        resolved = {}
+        for album_key, keys in by_album.items():
+            album = albums[album_key]
+            if isinstance(album, NotFoundError) or album["id"] not in tracklists:
+                continue
+            resolved.update(match_album_tracks(keys, tracklists[album["id"]], self.matcher))
+
+        for song_key, track_id in resolved.items():
+            self._cache.set_item("find_song", song_key, track_id)
+
+        logger.info("Resolved {} songs from {} albums".format(len(resolved), len(found_album_ids(albums))))
+        return resolved
+
+    def resolve_songs(self, songs):
+        """Look up every distinct (artist, album, title) of songs only once.
+
+        With album_first, songs are matched against the tracklists of their
+        albums first and only the rest is searched one by one. Returns a dict
+        mapping the keys to track ids or NotFoundError instances.
+        """
+        song_keys = self.unique_song_keys(songs)
+        resolved = {}
+        if self.album_first:
+            resolved.update(self.resolve_songs_by_album(self.uncached_song_keys(song_keys)))
+
+        leftovers = [key for key in song_keys if key not in resolved]
+        resolved.update(parallel_map(self._resolve_song, leftovers, self.jobs))
+        return resolved
+
+    def warm_cache(self, data: Dump):
+        """Look up every album and playlist song of data without changing the library.
+
+        A following load of the same dump is then answered from the cache.
+        """
+        self.need_authentication()
+        albums = list(data.group_songs_by_albums(data.songs))
+        logger.info("Resolving {} albums".format(len(albums)))
+        results = parallel_map(self._resolve_album, albums, self.jobs)
+        found = sum(1 for _, album in results if not isinstance(album, NotFoundError))
+        logger.info("Found {} of {} albums".format(found, len(albums)))
+
+        resolved = self.resolve_songs(song for playlist in data.playlists for song in playlist["tracks"])
+        self._log_warmed_songs(resolved)
+
+    def _log_warmed_songs(self, resolved):
+        found = sum(1 for track_id in resolved.values() if not isinstance(track_id, NotFoundError))
+        logger.info("Found {} of {} songs".format(found, len(resolved)))
+        self._cache.flush()
+
+    def submit_songs(self, songs, executor):
+        """Like resolve_songs, but return a dict of futures of the results.
+
+        The album first stage is done before returning, the remaining songs
+        are looked up by executor in the background.
+        """
+        song_keys = self.unique_song_keys(songs)
+        resolved = {}
+        if self.album_first:
+            resolved = self.resolve_songs_by_album(self.uncached_song_keys(song_keys))
+
+        futures = {}
+        for song_key in song_keys:
+            if song_key in resolved:
+                futures[song_key] = Future()
+                futures[song_key].set_result((song_key, resolved[song_key]))
+            else:
+                futures[song_key] = executor.submit(self._resolve_song, song_key)
+        return futures
+
+    def iter_track_ids(self, songs, futures):
+        """Yield the track ids of songs as soon as they are resolved."""
+        for song in songs:
+            song_key = (song["artist"], song["album"], song["title"])
+            track_id = futures[song_key].result()[1]
+            if isinstance(track_id, NotFoundError):
+                logger.warning("Not found: {}/{}".format(song["artist"], song["title"]))
+                continue
+            yield track_id
+
+    def get_track_ids_for_songs(self, songs, resolved=None):
+        if resolved is None:
+            resolved = self.resolve_songs(songs)
 
-    def get_track_ids_for_songs(self, songs):
         track_ids = []
         not_found = []
         for song in songs:
             artist = song["artist"]
             album = song["album"]
             title = song["title"]
-            try:
-                track_id = self.find_song(artist, album, title)
-            except NotFoundError:
+            track_id = resolved[(artist, album, title)]
+            if isinstance(track_id, NotFoundError):
                 not_found.append(song)
                 logger.warning("Not found: {}/{}".format(artist, title))
                 continue
@@ -201,20 +555,62 @@ class SpotifyProvider(Provider):
         return (track_ids, not_found)
 
     def create_playlist(self, name, track_ids):
-        logger.info("Creating playlist '{}' with {} tracks".format(name, len(track_ids)))
-        playlist = self.api.user_playlist_create(self.username, name, public=False)
-        playlist_id = playlist["id"]
-        for start_idx in range(0, len(track_ids), 100):
-            self.api.user_playlist_add_tracks(self.username, playlist_id, track_ids[start_idx:start_idx + 100])
-
-    def load_playlist(self, playlist, force: bool):
-        name = playlist["name"]
+        """Create playlist name with track_ids.
+
+        track_ids can be an iterator, batches of 100 tracks are added while
+        it is consumed. The playlist is created with the first batch, so no
+        empty playlist is left behind if no tracks were found.
+        """
+        state = {"id": self.journal.get_playlist_id(name)}
+        if state["id"] is not None:
+            logger.info("Resuming playlist '{}'".format(name))
+
+        def write(batch):
+            if state["id"] is None:
+                logger.info("Creating playlist '{}'".format(name))
+                playlist = self.api.user_playlist_create(self.username, name, public=False)
+                state["id"] = playlist["id"]
+                self.journal.record("playlist_created", name=name, id=state["id"])
+            self.api.user_playlist_add_tracks(self.username, state["id"], batch)
+            self.journal.record("tracks_added", name=name, ids=batch)
+
+        with BatchWriter(write, 100) as writer:
+            for track_id in self.journal.iter_remaining_tracks(name, track_ids):
+                writer.add(track_id)
+
+        if state["id"] is None:
+            logger.error("No songs found for playlist '{}'".format(name))
+            return
+        logger.info("Added {} tracks to playlist '{}'".format(writer.count, name))
+        self.journal.record("playlist_done", name=name)
+
+    def get_playlist_track_ids(self, playlist_id):
+        results = self.api.playlist_items(
+            playlist_id, fields="items(track(id)),next,total,limit,offset", additional_types=("track",)
+        )
+        return [item["track"]["id"] for item in self.fetch_all(results) if item["track"] and item["track"]["id"]]
+
+    def sync_playlist(self, name, playlist_id, track_ids, remove_extra=False):
+        missing, extra = diff_playlist(self.get_playlist_track_ids(playlist_id), track_ids)
+        logger.info("Syncing playlist '{}': {} tracks to add, {} not in the dump".format(name, len(missing), len(extra)))
+
+        for start_idx in range(0, len(missing), 100):
+            self.api.user_playlist_add_tracks(self.username, playlist_id, missing[start_idx:start_idx + 100])
+
+        if remove_extra:
+            extra = sorted(extra)
+            for start_idx in range(0, len(extra), 100):
+                self.api.playlist_remove_all_occurrences_of_items(playlist_id, extra[start_idx:start_idx + 100])
+        self.journal.record("playlist_done", name=name)
+
+    def prepare_playlist(self, playlist, force: bool, resolved=None):
+        """Return the track ids to create playlist with, None if it should be skipped."""
         songs = playlist["tracks"]
 
-        track_ids, not_found = self.get_track_ids_for_songs(songs)
+        track_ids, not_found = self.get_track_ids_for_songs(songs, resolved)
         if len(track_ids) == 0:
             logger.error("No songs found")
-            return
+            return None
         if len(track_ids) != len(songs):
             logger.warning("Some songs were not found")
             if not force:
@@ -223,31 +619,146 @@ class SpotifyProvider(Provider):
 
                 if not confirm("Are you sure to create the playlist? (y/n)"):
                     logger.info("Skipping...")
-                    return
+                    return None
+
+        return track_ids
 
-        self.create_playlist(name, track_ids)
+    def load_playlist(self, playlist, force: bool, resolved=None, playlist_id=None, remove_extra=False):
+        track_ids = self.prepare_playlist(playlist, force, resolved)
+        if track_ids is None:
+            return
+        if playlist_id is None:
+            self.create_playlist(playlist["name"], track_ids)
+        else:
+            self.sync_playlist(playlist["name"], playlist_id, track_ids, remove_extra)
 
     #            tracks = self.api.user_playlist(self.username, playlist["id"], fields="tracks")
 
     # self.api.user_playlist_add_tracks(self.username, playlist_id, track_ids)
 
-    def load_playlists(self, data: Dump, force: bool, force_create: bool):
-        self.need_authentication()
-        current_playlists = {x["name"]: x for x in self.fetch_all(self.api.current_user_playlists())}
-        #        import pdb
-        #        pdb.set_trace()
-        for playlist in data.playlists:
+    def select_playlists(self, playlists, current_playlists, force_create: bool, sync=False, force=False):
+        selected = []
+        for playlist in playlists:
             name = playlist["name"]
-            if not confirm("Do you want to import playlist '{}'? (y/n)".format(name)):
+            if self.journal.is_playlist_done(name):
+                logger.info("Playlist {} is already loaded according to the journal, skipping".format(name))
+                continue
+            if not force and not confirm("Do you want to import playlist '{}'? (y/n)".format(name)):
                 logger.info("Skipping...")
                 continue
-            if name in current_playlists and not force_create:
+            if name in current_playlists and not force_create and not sync:
                 logger.info("Playlist {} already exists, skipping".format(name))
                 continue
+            selected.append(playlist)
+        return selected
+
+    def get_current_playlists(self):
+        if self.journal.current_playlists is None:
+            playlists = self.fetch_all(self.api.current_user_playlists(limit=50))
+            self.journal.record("current_playlists", playlists=[{"name": x["name"], "id": x["id"]} for x in playlists])
+        return self.journal.current_playlists
+
+    def load_playlists(self, data: Dump, force: bool, force_create: bool, sync=False, remove_extra=False):
+        """Create the playlists of data.
+
+        Playlists which already exist are skipped, created again with
+        force_create or, with sync, updated in place by adding the missing
+        tracks (and removing the ones not in the dump with remove_extra).
+        """
+        self.need_authentication()
+        current_playlists = {x["name"]: x["id"] for x in self.get_current_playlists()}
+        selected = self.select_playlists(data.playlists, current_playlists, force_create, sync, force)
+
+        songs = (song for playlist in selected for song in playlist["tracks"])
+        if not force:
+            # every song has to be resolved before asking about the incomplete playlists
+            resolved = self.resolve_songs(songs)
+            self._cache.flush()
+
+            for playlist in selected:
+                playlist_id = current_playlists.get(playlist["name"]) if sync else None
+                self.load_playlist(playlist, force, resolved, playlist_id, remove_extra)
+            return
 
-            self.load_playlist(playlist, force)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = self.submit_songs(songs, executor)
+            for playlist in selected:
+                track_ids = self.iter_track_ids(playlist["tracks"], futures)
+                if sync and playlist["name"] in current_playlists:
+                    self.sync_playlist(playlist["name"], current_playlists[playlist["name"]], list(track_ids), remove_extra)
+                else:
+                    self.create_playlist(playlist["name"], track_ids)
+        self._cache.flush()
+
+    def iter_songs(self):
+        """Yield the tracks of the saved albums, then the saved tracks."""
+        self.need_authentication()
+        seen = set()
+
+        def unseen(songs):
+            for song in songs:
+                if song is None:
+                    continue
+                key = (song["artist"], song["album"], song["title"])
+                if key not in seen:
+                    seen.add(key)
+                    yield song
+
+        logger.info("Fetching saved albums")
+        saved_albums = self.fetch_all(self.api.current_user_saved_albums(limit=50))
+        logger.info("Number of saved albums: {}".format(len(saved_albums)))
+        for item in saved_albums:
+            album = item["album"]
+            tracks = album["tracks"]["items"]
+            if album["tracks"]["next"]:
+                tracks = self.fetch_all(album["tracks"])
+            yield from unseen(make_song(album, track) for track in tracks)
+
+        logger.info("Fetching saved tracks")
+        saved_tracks = self.fetch_all(self.api.current_user_saved_tracks(limit=50))
+        logger.info("Number of saved tracks: {}".format(len(saved_tracks)))
+        yield from unseen(make_song(item["track"]["album"], item["track"]) for item in saved_tracks if item["track"])
+
+    def iter_playlists(self):
+        self.need_authentication()
+        logger.info("Fetching playlists")
+        for playlist in self.fetch_all(self.api.current_user_playlists(limit=50)):
+            yield {"name": playlist["name"], "id": playlist["id"], "snapshot_id": playlist["snapshot_id"]}
+
+    def get_playlist_tracks(self, playlist):
+        """Return the tracks of playlist, from the cache if its snapshot did not change."""
+        cached = self._cache.get_item("playlist_tracks", playlist["id"])
+        if cached is not None and cached[0] == playlist["snapshot_id"]:
+            logger.info("Playlist: {} (unchanged)".format(playlist["name"]))
+            return cached[1]
+
+        results = self.api.playlist_items(playlist["id"], fields=PLAYLIST_TRACK_FIELDS, additional_types=("track",))
+        tracks = []
+        for item in self.fetch_all(results):
+            song = make_song(item["track"]["album"], item["track"]) if item["track"] else None
+            if song is not None:
+                tracks.append(song)
+        self._cache.set_item("playlist_tracks", playlist["id"], (playlist["snapshot_id"], tracks))
+        logger.info("Playlist: {}".format(playlist["name"]))
+        return tracks
+
+    def iter_playlist_tracks(self, playlist):
+        return iter(self.get_playlist_tracks(playlist))
+
+    def stream(self):
+        """Like Provider.stream(), but fetching jobs playlists at a time."""
+        def fetch(playlist):
+            return {"name": playlist["name"], "tracks": self.get_playlist_tracks(playlist)}
+
+        def playlists():
+            yield from parallel_map(fetch, self.iter_playlists(), self.jobs, window=self.jobs * 2)
+            self._cache.flush()
+
+        return {"songs": self.iter_songs(), "playlists": playlists()}
 
 
 class CachedSpotifyProvider(SpotifyProvider):
+    cache_spec = SPOTIFY_CACHE
+
     def init_cache(self):
-        return DiskCache("spotmover-spotify")
+        return TieredCache(self.cache_spec.open(self.cache_dir))
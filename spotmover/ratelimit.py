@@ -0,0 +1,223 @@
+import time
+import asyncio
+import random
+import logging
+import threading
+import functools
+
+logger = logging.getLogger(__name__)
+
+THROTTLED = "throttled"
+RETRY = "retry"
+UNSENT = "unsent"
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def reserve(self):
+        """Take one token and return the number of seconds to wait before using it."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        """Take one token, sleeping until it is available.
+
+        Returns the number of seconds spent waiting.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """Token bucket rate limiting with retries for API calls.
+
+    ``classify`` receives the exception raised by a call and returns either
+    ``None`` (not retryable), ``(RETRY, None)`` for transient errors which
+    are retried with jittered exponential backoff, ``(UNSENT, None)`` for
+    errors raised before the request reached the server (retried the same
+    way), or ``(THROTTLED, retry_after)`` when the server asked us to slow
+    down. In the latter case every caller pauses for ``retry_after`` seconds
+    and the request rate is halved, then recovers slowly on successful calls.
+
+    Calls which are not idempotent (``call_once()``) are only retried when
+    throttled or unsent: after other errors the server may have applied
+    them already, and sending them again could apply them twice.
+    """
+
+    def __init__(self, classify, rate=10.0, burst=None, max_retries=5, backoff_base=0.5, backoff_max=30.0,
+                 min_rate=0.5, recovery=1.05):
+        self.classify = classify
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.recovery = recovery
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_time = 0.0
+        self.throttle_time = 0.0
+        self.backoff_time = 0.0
+
+    def _pause_left(self):
+        """Return the time left of the pause asked by the server, if any."""
+        with self._lock:
+            pause = max(0.0, self._paused_until - time.monotonic())
+            self.throttle_time += pause
+        return pause
+
+    def _reserve(self):
+        """Return the time to wait before the next call is allowed to start."""
+        pause = self._pause_left()
+        wait = self.bucket.reserve()
+        with self._lock:
+            self.wait_time += wait
+        return pause + wait
+
+    def _on_success(self):
+        with self._lock:
+            self.calls += 1
+            rate = self.bucket.rate
+            if rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, rate * self.recovery))
+
+    def _on_throttled(self, retry_after):
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            rate = max(self.min_rate, self.bucket.rate / 2)
+            self.bucket.set_rate(rate)
+        logger.warning("Throttled by the server, pausing for {:.1f}s, rate lowered to {:.2f}/s".format(retry_after, rate))
+
+    def _on_error(self, err, attempt, idempotent=True):
+        """Decide whether a failed call is retried.
+
+        Returns the delay before the next attempt (0 for throttled calls, as
+        they wait for the pause in ``_reserve``) or raises ``err``.
+        """
+        kind = self.classify(err)
+        if kind is not None and kind[0] == RETRY and not idempotent:
+            kind = None
+        if kind is None or attempt >= self.max_retries:
+            with self._lock:
+                self.failures += 1
+            raise err
+
+        with self._lock:
+            self.retries += 1
+        kind, retry_after = kind
+        if kind == THROTTLED:
+            self._on_throttled(retry_after if retry_after is not None else self.backoff_base * 2 ** attempt)
+            return 0.0
+
+        logger.debug("Retrying after error ({}/{}): {}".format(attempt + 1, self.max_retries, err))
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        with self._lock:
+            self.backoff_time += delay
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        return self._call(func, args, kwargs, True)
+
+    def call_once(self, func, *args, **kwargs):
+        """Like call(), for calls which are not idempotent, see the class docstring."""
+        return self._call(func, args, kwargs, False)
+
+    def _call(self, func, args, kwargs, idempotent):
+        attempt = 0
+        while True:
+            wait = self._reserve()
+            while wait > 0:
+                time.sleep(wait)
+                # the server may have asked for a pause while this call was waiting
+                wait = self._pause_left()
+
+            try:
+                retval = func(*args, **kwargs)
+            except Exception as err:  # pylint: disable=W0703
+                delay = self._on_error(err, attempt, idempotent)
+                attempt += 1
+                if delay > 0:
+                    time.sleep(delay)
+                continue
+
+            self._on_success()
+            return retval
+
+    async def call_async(self, func, *args, idempotent=True, **kwargs):
+        attempt = 0
+        while True:
+            wait = self._reserve()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self._pause_left()
+
+            try:
+                retval = await func(*args, **kwargs)
+            except Exception as err:  # pylint: disable=W0703
+                delay = self._on_error(err, attempt, idempotent)
+                attempt += 1
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                continue
+
+            self._on_success()
+            return retval
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_time": self.wait_time,
+                "throttle_time": self.throttle_time,
+                "backoff_time": self.backoff_time,
+                "rate": self.bucket.rate,
+            }
+
+
+class RateLimitedClient:
+    """Proxy which routes every public method call of api through limiter.
+
+    The methods named in ``once`` are not idempotent (such as the ones
+    sending POST requests) and go through ``limiter.call_once()``.
+    """
+
+    def __init__(self, api, limiter, once=()):
+        self.api = api
+        self.limiter = limiter
+        self.once = frozenset(once)
+
+    def __getattr__(self, name):
+        attr = getattr(self.api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        if name in self.once:
+            return functools.partial(self.limiter.call_once, attr)
+        return functools.partial(self.limiter.call, attr)
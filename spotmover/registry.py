@@ -0,0 +1,50 @@
+import importlib
+from importlib.metadata import entry_points
+
+import click
+
+
+def iter_entry_points(group):
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        return eps.select(group=group)
+    return eps.get(group, [])
+
+
+def import_path(path):
+    """Return the object at "module:attribute" path."""
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LazyGroup(click.Group):
+    """Click group whose commands are imported only when they are used.
+
+    ``lazy_commands`` maps command names to "module:attribute" paths. The
+    entry points of ``entry_point_group`` are added to them, so other
+    packages can provide commands, for example for new providers.
+    """
+
+    def __init__(self, *args, lazy_commands=None, entry_point_group=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+        self.entry_point_group = entry_point_group
+        self._entry_points_loaded = False
+
+    def _get_lazy_commands(self):
+        if not self._entry_points_loaded and self.entry_point_group:
+            for entry_point in iter_entry_points(self.entry_point_group):
+                self.lazy_commands[entry_point.name] = entry_point.value
+            self._entry_points_loaded = True
+        return self.lazy_commands
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self._get_lazy_commands()))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self._get_lazy_commands():
+            command = import_path(self._get_lazy_commands()[cmd_name])
+            if not isinstance(command, click.Command):
+                raise click.ClickException("{} is not a click command".format(self.lazy_commands[cmd_name]))
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
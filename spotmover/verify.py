@@ -0,0 +1,169 @@
+from collections import Counter
+
+from spotmover.concurrency import parallel_map
+from spotmover.matching import normalize
+
+
+def memoize(key):
+    """Return key with its results kept for the whole run, names repeat a lot."""
+    keys = {}
+
+    def cached_key(text):
+        try:
+            return keys[text]
+        except KeyError:
+            retval = keys[text] = key(text)
+            return retval
+
+    return cached_key
+
+
+class AlbumIndex:
+    """Songs grouped by the key of their album, with the keys of their titles.
+
+    The first spelling of every album and title is kept for the report.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.albums = {}
+        self.names = {}
+
+    def add(self, song):
+        album_key = (self.key(song["artist"]), self.key(song["album"]))
+        titles = self.albums.get(album_key)
+        if titles is None:
+            titles = self.albums[album_key] = {}
+            self.names[album_key] = (song["artist"], song["album"])
+        titles.setdefault(self.key(song["title"]), song["title"])
+
+    def update(self, songs):
+        for song in songs:
+            self.add(song)
+        return self
+
+
+def count_songs(songs, key):
+    """Return a Counter of the song keys and the first song of every key."""
+    counts = Counter()
+    first = {}
+    for song in songs:
+        song_key = (key(song["artist"]), key(song["album"]), key(song["title"]))
+        counts[song_key] += 1
+        first.setdefault(song_key, song)
+    return (counts, first)
+
+
+def _expand(counts, songs):
+    retval = []
+    for song_key, count in counts.items():
+        song = songs[song_key]
+        retval.extend({"artist": song["artist"], "album": song["album"], "title": song["title"]} for _ in range(count))
+    return retval
+
+
+def compare_albums(wanted, current):
+    """Compare the albums of two AlbumIndex, return the report of every wanted album and the extra ones."""
+    albums = []
+    for album_key, titles in wanted.albums.items():
+        artist, album = wanted.names[album_key]
+        current_titles = current.albums.get(album_key)
+        if current_titles is None:
+            missing = list(titles.values())
+            status = "missing"
+        else:
+            missing = [title for title_key, title in titles.items() if title_key not in current_titles]
+            status = "partial" if missing else "complete"
+        albums.append({
+            "artist": artist,
+            "album": album,
+            "status": status,
+            "tracks": len(titles),
+            "matched": len(titles) - len(missing),
+            "missing": missing,
+        })
+
+    extra = [
+        {"artist": current.names[album_key][0], "album": current.names[album_key][1], "tracks": len(titles)}
+        for album_key, titles in current.albums.items() if album_key not in wanted.albums
+    ]
+    return (albums, extra)
+
+
+def compare_playlist(name, tracks, current_tracks, key):
+    """Compare the tracks of a playlist of the dump with the ones in the account (None if it does not exist)."""
+    wanted, wanted_songs = count_songs(tracks, key)
+    if current_tracks is None:
+        current, current_songs = Counter(), {}
+    else:
+        current, current_songs = count_songs(current_tracks, key)
+
+    missing = wanted - current
+    extra = current - wanted
+    if current_tracks is None:
+        status = "missing"
+    elif missing:
+        status = "partial"
+    else:
+        status = "complete"
+    return {
+        "name": name,
+        "status": status,
+        "tracks": sum(wanted.values()),
+        "matched": sum((wanted & current).values()),
+        "missing": _expand(missing, wanted_songs),
+        "extra": _expand(extra, current_songs),
+    }
+
+
+def summarize(items):
+    retval = {"total": len(items), "complete": 0, "partial": 0, "missing": 0}
+    for item in items:
+        retval[item["status"]] += 1
+    return retval
+
+
+def reconcile(data, provider, jobs=1, key=normalize):
+    """Compare data with the library of an authenticated provider, return the report as a dict.
+
+    Both sides are indexed by the keys of the names, so the songs of data
+    are checked against the songs of the library album by album, and every
+    playlist against the playlist of the same name, without any search.
+    Only the playlists of data are fetched, jobs at a time.
+    """
+    key = memoize(key)
+    wanted = AlbumIndex(key).update(data.songs)
+    current = AlbumIndex(key).update(provider.iter_songs())
+    albums, extra_albums = compare_albums(wanted, current)
+
+    current_playlists = {playlist["name"]: playlist for playlist in provider.iter_playlists()}
+
+    def check_playlist(playlist):
+        current_playlist = current_playlists.get(playlist["name"])
+        current_tracks = None
+        if current_playlist is not None:
+            current_tracks = list(provider.iter_playlist_tracks(current_playlist))
+        return compare_playlist(playlist["name"], playlist["tracks"], current_tracks, key)
+
+    playlists = list(parallel_map(check_playlist, data.playlists, jobs, window=jobs * 2))
+    wanted_names = set(playlist["name"] for playlist in playlists)
+    extra_playlists = [name for name in current_playlists if name not in wanted_names]
+
+    songs = Counter()
+    for album in albums:
+        songs["total"] += album["tracks"]
+        songs["matched"] += album["matched"]
+    songs["missing"] = songs["total"] - songs["matched"]
+
+    return {
+        "origin": data.origin,
+        "summary": {
+            "albums": dict(summarize(albums), extra=len(extra_albums)),
+            "songs": dict(songs),
+            "playlists": dict(summarize(playlists), extra=len(extra_playlists)),
+        },
+        "albums": albums,
+        "extra_albums": extra_albums,
+        "playlists": playlists,
+        "extra_playlists": extra_playlists,
+    }
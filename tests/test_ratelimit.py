@@ -0,0 +1,83 @@
+import time
+import asyncio
+import unittest
+import threading
+
+from spotmover.ratelimit import THROTTLED, RateLimiter
+
+
+class Throttled(Exception):
+    pass
+
+
+def classify(err):
+    if isinstance(err, Throttled):
+        return (THROTTLED, 0.3)
+    return None
+
+
+class ThrottledServer:
+    """Answers the first request with a 429 after 50ms and records when the other ones are sent."""
+
+    def __init__(self):
+        self.first = True
+        self.throttled_at = None
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def _is_first(self):
+        with self._lock:
+            first, self.first = self.first, False
+            if not first:
+                self.sent.append(time.monotonic())
+            return first
+
+    def _throttle(self):
+        self.throttled_at = time.monotonic()
+        raise Throttled()
+
+    def handle(self):
+        if self._is_first():
+            time.sleep(0.05)
+            self._throttle()
+
+    async def handle_async(self):
+        if self._is_first():
+            await asyncio.sleep(0.05)
+            self._throttle()
+
+
+class RateLimiterThrottleTest(unittest.TestCase):
+    # 20 calls at 50/s are scheduled over 0.4s, the 429 of the first one comes after 50ms and asks
+    # for a 0.3s pause: the calls already sent are not affected, none is sent during the pause
+
+    def assert_paused(self, server, limiter):
+        self.assertEqual(len(server.sent), 20)
+        self.assertEqual(limiter.throttled, 1)
+        after = [sent_at - server.throttled_at for sent_at in server.sent if sent_at > server.throttled_at]
+        self.assertGreater(len(after), 10)
+        self.assertGreaterEqual(min(after), 0.29)
+
+    def test_pause_applies_to_calls_in_flight(self):
+        limiter = RateLimiter(classify, rate=50.0, burst=1)
+        server = ThrottledServer()
+        threads = [threading.Thread(target=limiter.call, args=(server.handle,)) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assert_paused(server, limiter)
+
+    def test_pause_applies_to_scheduled_async_calls(self):
+        limiter = RateLimiter(classify, rate=50.0, burst=1)
+        server = ThrottledServer()
+
+        async def run():
+            await asyncio.gather(*(limiter.call_async(server.handle_async) for _ in range(20)))
+
+        asyncio.run(run())
+        self.assert_paused(server, limiter)
+
+
+if __name__ == "__main__":
+    unittest.main()
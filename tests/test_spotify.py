@@ -0,0 +1,32 @@
+import unittest
+from unittest import mock
+
+from spotmover.journal import Journal
+from spotmover.providers.spotify.spotify import SpotifyProvider
+
+PLAYLISTS = [{"name": "first", "tracks": []}, {"name": "second", "tracks": []}, {"name": "done", "tracks": []}]
+
+
+class SelectPlaylistsTest(unittest.TestCase):
+
+    def setUp(self):
+        journal = Journal()
+        journal.record("playlist_done", name="done")
+        self.provider = SpotifyProvider(journal=journal)
+
+    def select(self, **kwargs):
+        return [playlist["name"] for playlist in self.provider.select_playlists(PLAYLISTS, {}, False, **kwargs)]
+
+    def test_asks_about_every_playlist(self):
+        with mock.patch("spotmover.providers.spotify.spotify.confirm", side_effect=[True, False]) as confirm:
+            self.assertEqual(self.select(), ["first"])
+        self.assertEqual(confirm.call_count, 2)
+
+    def test_force_does_not_ask(self):
+        with mock.patch("spotmover.providers.spotify.spotify.confirm") as confirm:
+            self.assertEqual(self.select(force=True), ["first", "second"])
+        confirm.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()